@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from repl_matcher import ReplMatcher, split_lines
+
+
+def legacy_replace(repl_dict, text):
+    '''
+    The per-line, per-key loop that replace_text_in_string used before ReplMatcher.
+    '''
+    key_count = 0
+    new_lines = []
+    for line in split_lines(text):
+        for key, replacement in repl_dict.items():
+            key_count += line.count(key)
+            line = line.replace(key, replacement)
+        new_lines.append(line)
+
+    return "".join(new_lines), key_count
+
+
+def build_repl_dict(n_keys):
+    return {f"[[translation:{uuid.uuid4()}]]": f"translation {i}" for i in range(n_keys)}
+
+
+def build_text(repl_dict, n_lines, key_density):
+    keys = list(repl_dict.keys())
+    lines = []
+    for i in range(n_lines):
+        if random.random() < key_density:
+            lines.append(f'\t\t<Text style={{styles.text}}>{random.choice(keys)}</Text>\n')
+        else:
+            lines.append(f'\tconst value{i} = someFunction(arg{i}, "{i}");\n')
+    return "".join(lines)
+
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--keys', type=int, nargs='+', default=[100, 1000, 5000],
+                        help="repl sheet sizes to benchmark")
+
+    parser.add_argument('--lines', type=int, default=20000,
+                        help="number of lines in the synthetic source text")
+
+    parser.add_argument('--key_density', type=float, default=0.05,
+                        help="fraction of lines that contain a key")
+
+    parser.add_argument('--seed', type=int, default=0)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+
+    args = get_args()
+    random.seed(args.seed)
+
+    rows = []
+    for n_keys in args.keys:
+        repl_dict = build_repl_dict(n_keys)
+        text = build_text(repl_dict, args.lines, args.key_density)
+
+        matcher, build_time = time_it(ReplMatcher.from_dict, repl_dict)
+        legacy_result, legacy_time = time_it(legacy_replace, repl_dict, text)
+        matcher_result, matcher_time = time_it(matcher.replace, text)
+
+        assert legacy_result == matcher_result, "ReplMatcher result differs from the legacy loop"
+
+        rows.append([n_keys, args.lines, matcher_result[1], f"{legacy_time:.3f}",
+                     f"{build_time:.3f}", f"{matcher_time:.3f}", f"{legacy_time / matcher_time:.1f}x"])
+
+    print(tabulate(rows, headers=["Keys", "Lines", "Replacements", "Legacy (s)",
+                                  "Matcher build (s)", "Matcher (s)", "Speedup"]))
@@ -0,0 +1,58 @@
+import os
+import sys
+import argparse
+import subprocess
+from tabulate import tabulate
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+MODULES = ["localizer", "check_repl_sheet", "pandas"]
+
+
+def import_time(module):
+    '''
+    Imports module in a fresh interpreter with -X importtime. Returns the total import time
+    in seconds and the slowest top-level imports as (seconds, name).
+    '''
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # top-level imports are not indented
+        if not name[1:].startswith(" "):
+            top_level.append((int(cumulative) / 1e6, name.strip()))
+
+    total = sum(seconds for seconds, _ in top_level)
+    return total, sorted(top_level, reverse=True)
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--modules', type=str, nargs='+', default=MODULES,
+                        help="modules to import, from the scripts directory")
+
+    parser.add_argument('--runs', type=int, default=5,
+                        help="imports per module, the fastest one is reported")
+
+    parser.add_argument('--top', type=int, default=5,
+                        help="number of slowest top-level imports to show per module")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    rows = []
+    for module in args.modules:
+        total, top_level = min((import_time(module) for _ in range(args.runs)), key=lambda run: run[0])
+        slowest = ", ".join(f"{name} ({seconds * 1000:.0f} ms)" for seconds, name in top_level[:args.top])
+        rows.append([module, f"{total * 1000:.0f}", slowest])
+
+    print(tabulate(rows, headers=["Module", "Import time (ms)", "Slowest imports"]))
@@ -0,0 +1,243 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime
+from contextlib import redirect_stdout
+from tabulate import tabulate
+
+import synthetic
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+SOURCES_DIR = os.path.join(ROOT_DIR, "sources")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, SOURCES_DIR)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def bench_localizer(work_dir, sheets, localizer_args):
+    '''
+    Localizes a fresh copy of the synthetic tree with the given (kind, repl_file, key, repl) sheets.
+    '''
+    from localizer import Localizer, get_args
+
+    tree = os.path.join(work_dir, "tree")
+    run_tree = tempfile.mkdtemp(dir=work_dir, prefix="run-")
+    shutil.rmtree(run_tree)
+    shutil.copytree(tree, run_tree)
+
+    argv = ["--dir", run_tree] + localizer_args
+    for _, repl_file, key, repl in sheets:
+        argv += ["--sheet", repl_file, key, repl]
+
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        localizer = Localizer(get_args(argv))
+        localizer.replace_text_all()
+    seconds = time.perf_counter() - start
+
+    shutil.rmtree(run_tree)
+    return seconds, len(localizer.files), localizer.total_succeeds
+
+
+def bench_checker(repl_file):
+    from check_repl_sheet import ReplChecker
+
+    start = time.perf_counter()
+    checker = ReplChecker(repl_file)
+    checker.check_all()
+    return time.perf_counter() - start
+
+
+def bench_codegen(work_dir, recipes):
+    import script
+
+    model_dir = os.path.join(work_dir, "models")
+    synthetic.generate_models(model_dir)
+    script.MODEL_DIR = model_dir
+
+    steps = [
+        script.CodeGen.handle_map_host_to_article_source_identifier,
+        script.CodeGen.handle_map_article_source_identifier_to_regex,
+        script.CodeGen.handle_article_hostnames,
+        script.CodeGen.handle_article_source_identifier,
+        script.CodeGen.handle_scaper_factory,
+    ]
+
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        script.CodeGen.session = script.CodeGenSession()
+        script.Pipeline(steps).run(recipes)
+        script.CodeGen.session.flush()
+    return time.perf_counter() - start
+
+
+def run_benchmark(queue, name, fn, fn_args):
+    '''
+    Runs one benchmark in a fresh process, so its peak RSS is its own.
+    '''
+    try:
+        queue.put((fn(*fn_args), peak_rss_mb(), None))
+    except Exception as e:
+        queue.put((None, peak_rss_mb(), f"{type(e).__name__}: {e}"))
+
+
+def measure(name, fn, *fn_args):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_benchmark, args=(queue, name, fn, fn_args))
+    process.start()
+    result, rss, error = queue.get()
+    process.join()
+
+    if error is not None:
+        raise RuntimeError(f"Benchmark {name} failed: {error}")
+
+    return result, rss
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--files', type=int, default=500,
+                        help="number of .ts/.tsx files in the synthetic tree")
+
+    parser.add_argument('--lines', type=int, default=200,
+                        help="lines per synthetic file")
+
+    parser.add_argument('--key_density', type=float, default=0.05,
+                        help="fraction of lines that contain a repl key")
+
+    parser.add_argument('--text_rows', type=int, default=2000,
+                        help="rows in the synthetic repl_text sheet")
+
+    parser.add_argument('--emoji_rows', type=int, default=50,
+                        help="rows in the synthetic repl_emoji sheet")
+
+    parser.add_argument('--values_rows', type=int, default=50,
+                        help="rows in the synthetic repl_values sheet")
+
+    parser.add_argument('--sources', type=int, default=200,
+                        help="number of article sources for the CodeGen benchmark")
+
+    parser.add_argument('--localizer_args', type=str, default="",
+                        help='''Extra arguments for every Localizer run, e.g. "--jobs 4" or "--mmap".''')
+
+    parser.add_argument('--seed', type=int, default=0)
+
+    parser.add_argument('--output', type=str, default=None,
+                        help="JSON file to save results to (default: benchmarks/results/<timestamp>.json)")
+
+    parser.add_argument('--compare', type=str, default=None,
+                        help="JSON results of an earlier run to compare against")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+
+    args = get_args()
+    rng = synthetic.make_rng(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="localization-bench-")
+
+    try:
+        sheets = []
+        for kind, rows in [("text", args.text_rows), ("emoji", args.emoji_rows), ("values", args.values_rows)]:
+            repl_file = os.path.join(work_dir, f"repl_{kind}.csv")
+            key, repl, keys = synthetic.generate_sheet(repl_file, kind, rows, rng)
+            sheets.append((kind, repl_file, key, repl, keys))
+
+        all_keys = [key for *_, keys in sheets for key in keys]
+        tree_bytes = synthetic.generate_tree(os.path.join(work_dir, "tree"), args.files, args.lines,
+                                             args.key_density, all_keys, rng)
+        recipes = synthetic.generate_codegen_recipes(args.sources, rng)
+        localizer_args = args.localizer_args.split()
+
+        results = []
+
+        def add_result(name, seconds, rss, **extra):
+            results.append(dict(name=name, seconds=round(seconds, 4), peak_rss_mb=round(rss, 1), **extra))
+
+        for kind, repl_file, key, repl, _ in sheets + [("all", None, None, None, None)]:
+            run_sheets = [sheet[:4] for sheet in sheets] if kind == "all" else [(kind, repl_file, key, repl)]
+            (seconds, n_files, replacements), rss = measure(f"localizer_{kind}", bench_localizer, work_dir,
+                                                            run_sheets, localizer_args)
+            add_result(f"localizer_{kind}", seconds, rss, files=n_files, replacements=replacements,
+                       mb_per_s=round(tree_bytes / (1 << 20) / seconds, 2),
+                       files_per_s=round(n_files / seconds, 1))
+
+        for kind, repl_file, _, _, keys in sheets:
+            seconds, rss = measure(f"checker_{kind}", bench_checker, repl_file)
+            add_result(f"checker_{kind}", seconds, rss, rows=len(keys), rows_per_s=round(len(keys) / seconds, 1))
+
+        seconds, rss = measure("codegen", bench_codegen, work_dir, recipes)
+        add_result("codegen", seconds, rss, recipes=len(recipes), recipes_per_s=round(len(recipes) / seconds, 1))
+
+    finally:
+        shutil.rmtree(work_dir)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: val for key, val in vars(args).items() if key not in ["output", "compare"]},
+        "tree_mb": round(tree_bytes / (1 << 20), 2),
+        "results": results,
+    }
+
+    headers = ["Benchmark", "Seconds", "Peak RSS (MB)", "Throughput"]
+    rows = []
+    for result in results:
+        if "mb_per_s" in result:
+            throughput = f"{result['mb_per_s']} MB/s, {result['files_per_s']} files/s"
+        elif "rows_per_s" in result:
+            throughput = f"{result['rows_per_s']} rows/s"
+        else:
+            throughput = f"{result['recipes_per_s']} recipes/s"
+        rows.append([result["name"], result["seconds"], result["peak_rss_mb"], throughput])
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = {result["name"]: result for result in json.load(f)["results"]}
+        headers.append("vs. baseline")
+        for row, result in zip(rows, results):
+            old = baseline.get(result["name"])
+            row.append(f"{old['seconds'] / result['seconds']:.2f}x" if old else "")
+
+    print(f"\nSynthetic tree: {args.files} files, {report['tree_mb']} MB\n")
+    print(tabulate(rows, headers=headers))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    print(f"\nSaved results to {output}")
@@ -0,0 +1,139 @@
+import os
+import csv
+import uuid
+import random
+
+# Columns of the real sheets in repl/, so the localizer and ReplChecker read them the same way.
+TEXT_COLUMNS = ["UUID_v4", "repo", "location", "path", "translation_needed", "type", "english",
+                "translation", "Icelandic", "context", "key", "delim", "emoji", "formating_exists"]
+EMOJI_COLUMNS = ["UUID_v4", "english", "translation", "key", "emoji", "unicode_english", "unicode_translation"]
+VALUES_COLUMNS = ["UUID_v4", "repo", "location", "path", "translation_needed", "english", "translation",
+                  "context", "key", "delim"]
+
+EMOJIS = ["🇺🇸", "🤫", "🧘", "😩", "🎉", "👍", "🔥", "💡", "🚀", "✅"]
+WORDS = ["answer", "question", "select", "snippet", "user", "level", "game", "article",
+         "review", "search", "submit", "continue", "points", "today", "week"]
+
+
+def random_sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+
+def generate_sheet(path, kind, rows, rng):
+    '''
+    Writes a synthetic repl sheet of the given kind (text, emoji or values) and returns its
+    (key column, repl column, keys).
+    '''
+    keys = []
+    with open(path, 'w', newline='') as f:
+        if kind == "text":
+            writer = csv.DictWriter(f, fieldnames=TEXT_COLUMNS)
+            writer.writeheader()
+            for i in range(rows):
+                row_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                english = random_sentence(rng, rng.randint(1, 8))
+                translation = english.upper()
+                if i % 20 == 0:
+                    english += " ${count}"
+                    translation += " ${count}"
+                key = f"[[translation:{row_id}]]"
+                keys.append(key)
+                writer.writerow({"UUID_v4": row_id, "repo": "qa-crowdsourcing-app", "type": "text",
+                                 "english": english, "translation": translation, "key": key,
+                                 "delim": "/", "emoji": "No", "formating_exists": "No"})
+            return "key", "translation", keys
+
+        if kind == "emoji":
+            writer = csv.DictWriter(f, fieldnames=EMOJI_COLUMNS)
+            writer.writeheader()
+            for i in range(rows):
+                row_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                key = f"[[translation:{row_id}]]"
+                keys.append(key)
+                writer.writerow({"UUID_v4": row_id, "english": rng.choice(EMOJIS),
+                                 "translation": rng.choice(EMOJIS), "key": key, "emoji": "Yes"})
+            return "key", "translation", keys
+
+        writer = csv.DictWriter(f, fieldnames=VALUES_COLUMNS)
+        writer.writeheader()
+        for i in range(rows):
+            english = f"https://example.com/value/{i}/{rng.getrandbits(32):08x}"
+            keys.append(english)
+            writer.writerow({"english": english, "translation": english.replace("example.com", "example.is")})
+        return "english", "translation", keys
+
+
+def generate_tree(root, files, lines_per_file, key_density, keys, rng):
+    '''
+    Writes a synthetic tree of .ts/.tsx files. key_density is the fraction of lines that hold a key.
+    Returns the total size in bytes.
+    '''
+    total_bytes = 0
+    for i in range(files):
+        directory = os.path.join(root, "src", f"module{i % 25}", f"component{i % 7}")
+        os.makedirs(directory, exist_ok=True)
+        extension = "tsx" if i % 2 else "ts"
+
+        lines = [f'import {{ helper{i} }} from "../../utils";\n']
+        for j in range(lines_per_file):
+            if keys and rng.random() < key_density:
+                if extension == "tsx":
+                    lines.append(f'\t\t\t<Text style={{styles.text{j}}}>{rng.choice(keys)}</Text>\n')
+                else:
+                    lines.append(f'\tconst message{j} = "{rng.choice(keys)}";\n')
+            else:
+                lines.append(f'\tconst value{j} = helper{i}(value{max(j - 1, 0)}, {j});\n')
+
+        content = "".join(lines)
+        with open(os.path.join(directory, f"file{i}.{extension}"), 'w') as f:
+            f.write(content)
+        total_bytes += len(content.encode())
+
+    return total_bytes
+
+
+def generate_models(model_dir):
+    '''
+    Writes the TypeScript files that CodeGen in sources/script.py edits, with empty regions.
+    '''
+    files = {
+        "ArticleSources/utils.ts": (
+            'import { ArticleSourceIdentifier } from "./interface";\n\n'
+            'export const mapHostToArticleSourceIdentifier: { [key: string]: ArticleSourceIdentifier } = {\n};\n\n'
+            'export const mapArticleSourceIdentifierToArticleKeyRegex: { [key: string]: RegExp } = {\n};\n'
+        ),
+        "ArticleSources/interface.ts": (
+            'export type ArticleSourceIdentifier =\n\t| "__wiki__";\n\n'
+            'export type ArticleHostnames =\n\t| "is.wikipedia.org";\n'
+        ),
+        "Articles/ScrapingService/ScrapingFactory/index.ts": (
+            'import { ArticleScraper } from "../interface";\n'
+            'import { ArticleSourceIdentifier } from "./interface";\n\n'
+            'export class ScraperFactory {\n'
+            '\tconstructor(source: ArticleSourceIdentifier, sourceArticleKey: string) {\n'
+            '\t\tswitch (source) {\n\t\t\tdefault:\n\t\t\t\tthrow new Error("Unknown source");\n\t\t}\n\t}\n}\n'
+        ),
+    }
+    for name, content in files.items():
+        path = os.path.join(model_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+
+def generate_codegen_recipes(n_sources, rng):
+    recipes = []
+    for i in range(n_sources):
+        name = f"Source{i}"
+        for j in range(rng.randint(1, 3)):
+            recipes.append({
+                'display_name': name,
+                'domain': f"www.source{i}-{j}.is",
+                'identifier': f"__source{i}__",
+                'regex': f"(?<=source{i}-{j}\\\\.is\\\\/)[^#?]*",
+            })
+    return recipes
+
+
+def make_rng(seed):
+    return random.Random(seed)
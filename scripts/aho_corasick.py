@@ -0,0 +1,70 @@
+from collections import deque
+
+
+class AhoCorasick:
+    '''
+    Aho-Corasick automaton over a list of patterns.
+
+    find_all(text) reports every occurrence of every pattern in text, overlapping ones
+    included, in time linear in the length of text plus the number of occurrences.
+    '''
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+        # per state: transitions, failure link, index of the pattern ending here (or -1)
+        # and the nearest state on the failure chain where a pattern ends (or 0).
+        goto = [{}]
+        ends = [-1]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                transitions = goto[state]
+                state = transitions.get(char)
+                if state is None:
+                    state = transitions[char] = len(goto)
+                    goto.append({})
+                    ends.append(-1)
+            if ends[state] == -1:
+                ends[state] = index
+
+        fail = [0] * len(goto)
+        output = [0] * len(goto)
+
+        # breadth first, so the failure links of shorter prefixes are set first.
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                link = goto[link].get(char, 0)
+                fail[next_state] = link
+                output[next_state] = link if ends[link] != -1 else output[link]
+                queue.append(next_state)
+
+        self.goto = goto
+        self.fail = fail
+        self.ends = ends
+        self.output = output
+
+    def find_all(self, text):
+        '''
+        Yields (start, pattern index) of every occurrence in text.
+
+        A pattern that is given more than once is reported by its first index.
+        '''
+        goto, fail, ends, output, patterns = self.goto, self.fail, self.ends, self.output, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match = state if ends[state] != -1 else output[state]
+            while match:
+                index = ends[match]
+                yield position + 1 - len(patterns[index]), index
+                match = output[match]
@@ -1,31 +1,53 @@
-import re
+import io
+import os
+import glob
+import argparse
+import multiprocessing
+from contextlib import redirect_stdout
 from tabulate import tabulate
-from collections import defaultdict
 from termcolor import colored
 
+from repl_artifact import load_artifact
+from aho_corasick import AhoCorasick
+
 import pandas as pd
-import numpy as np
 
 REPL_TEXT_FILE = "repl/repl_text.csv"
 REPL_EMOJI_FILE = "repl/repl_emoji.csv"
 REPL_VALUES_FILE = "repl/repl_values.csv"
 
+FORMAT_PATTERN = r"(\${.*?})"
+
+def sheet_type(file_name):
+    '''
+    Type of a sheet from its file name (not the directories it is in): text, emoji, values,
+    or else the file name without its extension.
+    '''
+    name = os.path.splitext(os.path.basename(file_name))[0]
+    for sheet_type in ["text", "emoji", "values"]:
+        if sheet_type in name:
+            return sheet_type
+    return name
+
 class ReplChecker:
     
-    def __init__(self, file_name):
+    def __init__(self, file_name, artifact=None):
         '''
-        
+        artifact is an opened repl artifact to take the sheet from, when it has a fresh copy of it.
         '''
         self.scorecard = []
+        # per-row failure mask of every check that was run, and what was expected and found per row
+        self.failures = {}
+        self.expected = {}
+        self.found = {}
         self.file_name = file_name
-        if "text" in file_name:
-            self.type = "text"
-        elif "emoji" in file_name:
-            self.type = "emoji"
-        elif "values" in file_name:
-            self.type = "values"
+        self.type = sheet_type(file_name)
             
-        self.df = pd.read_csv(self.file_name)
+        sheet = artifact.find_sheet(file_name) if artifact is not None else None
+        if sheet is not None:
+            self.df = pd.DataFrame(artifact.columns(sheet))
+        else:
+            self.df = pd.read_csv(self.file_name)
         
     def populate_checks(self, test_name, test_result, test_note):
         '''
@@ -45,17 +67,21 @@ class ReplChecker:
         self.check_translation_completion()
         self.check_formatted_strings()
         self.check_double_quotes()
+        self.check_key_overlaps()
     
+    def column(self, name):
+        '''
+        Column as pandas strings, with <NA> for empty cells, so the .str methods work on any sheet.
+        '''
+        return self.df[name].astype("string")
+
     def check_double_quotes(self):
+        '''
+        Returns a per-row mask of translations with double quotes.
+        '''
         test_name = "Double Quotes"
-        double_quotes_count = 0
-        
-        for i in range(self.df.index.size):
-            translation = self.df["translation"][i]
-            if type(translation) != str and np.isnan(translation):
-                continue
-            if '"' in translation:
-                double_quotes_count += translation.count('"')
+        quote_counts = self.column("translation").str.count('"').fillna(0).astype(int)
+        double_quotes_count = int(quote_counts.sum())
         
         test_note = f"{double_quotes_count} Double Quotes Found. Use single quotes"
         
@@ -66,6 +92,10 @@ class ReplChecker:
             test_result = "FAIL"
         
         self.populate_checks(test_name=test_name, test_result=test_result, test_note=test_note)
+        self.failures[test_name] = quote_counts > 0
+        self.expected[test_name] = "no double quotes"
+        self.found[test_name] = quote_counts.astype(str) + " double quotes"
+        return self.failures[test_name]
     
     def check_translation_completion(self):
         '''
@@ -81,48 +111,38 @@ class ReplChecker:
             test_result = "PASS"
         
         self.populate_checks(test_name=test_name, test_result=test_result, test_note=test_note)
+        self.failures[test_name] = self.df["translation"].isnull()
+        self.expected[test_name] = "a translation"
+        self.found[test_name] = "empty"
+        return self.failures[test_name]
     
 
+    def placeholder_counts(self, placeholders):
+        '''
+        Count of every ${...} placeholder per row, indexed by (row, placeholder).
+        '''
+        placeholders = placeholders.explode().dropna()
+        return placeholders.groupby([placeholders.index, placeholders.values]).size()
+
     def check_formatted_strings(self):
         '''
-        
+        Compares the ${...} placeholders of english and translation as multisets, per row.
+        Returns a per-row mask of rows with unmatched placeholders.
         '''
         test_name = "Formatted Strings like ${.*}"
-        regex_pattern = r"(\${.*?})"
         
-        matched_formats = 0
-        unmatched_formats = 0
+        english = self.column("english").str.findall(FORMAT_PATTERN)
+        translation = self.column("translation").str.findall(FORMAT_PATTERN)
         
-        for i in range(self.df.index.size):
-                
-            english = self.df["english"][i]
-            translation = self.df["translation"][i]
-            
-            english_formats = re.search(regex_pattern, english)
-            english_format_counts = defaultdict(lambda: 0)
-            
-            if english_formats is not None:
-                for j in range(len(english_formats.groups())):
-                    match = english_formats.group(j)
-                    english_format_counts[match] += 1
-                
-                if type(translation) != str and np.isnan(translation):
-                    unmatched_formats += len(english_formats.groups())
-                
-                else:    
-                    translation_formats = re.search(regex_pattern, translation)
-                    if translation_formats is None:
-                        unmatched_formats += len(english_formats.groups())
-                    
-                    else:
-                        for j in range(len(translation_formats.groups())):
-                            match = translation_formats.group(j)
-                            if english_format_counts[match] > 0:
-                                matched_formats += 1
-                                english_format_counts[match] -= 1
-                            
-                            else:
-                                unmatched_formats += 1
+        counts = pd.concat([self.placeholder_counts(english), self.placeholder_counts(translation)],
+                           axis=1, keys=["english", "translation"]).fillna(0)
+        
+        matched = counts.min(axis=1).groupby(level=0).sum()
+        unmatched = (counts["english"] - counts["translation"]).abs().groupby(level=0).sum()
+        unmatched = unmatched.reindex(self.df.index, fill_value=0)
+        
+        matched_formats = int(matched.sum())
+        unmatched_formats = int(unmatched.sum())
         
         test_note = f"{matched_formats} MATCHED string formats and {unmatched_formats} UNMATHCED string formats"
         
@@ -133,25 +153,202 @@ class ReplChecker:
             test_result = "FAIL"
         
         self.populate_checks(test_name=test_name, test_result=test_result, test_note=test_note)
+        self.failures[test_name] = unmatched > 0
+        self.expected[test_name] = english.str.join(" ").fillna("")
+        self.found[test_name] = translation.str.join(" ").fillna("")
+        return self.failures[test_name]
+    
+    def key_column(self):
+        '''
+        The column the localizer searches for, "key" for text and emoji and "english" for values.
+        '''
+        return "key" if "key" in self.df else "english"
+
+    def check_key_overlaps(self):
+        '''
+        Finds keys that contain another key, and translations that contain a key other than their
+        own, in one Aho-Corasick pass over all keys and translations.
+        Either makes the result depend on the order keys are replaced in.
+        Returns a per-row mask of rows with overlaps.
+        '''
+        test_name = "Key Overlaps"
+        
+        keys = self.column(self.key_column())
+        translations = self.column("translation")
+        
+        unique_keys = list(dict.fromkeys(keys.dropna()))
+        automaton = AhoCorasick(unique_keys)
+        
+        def contained_keys(text, own_key):
+            found = dict.fromkeys(unique_keys[index] for _, index in automaton.find_all(text))
+            found.pop(own_key, None)
+            return list(found)
+        
+        key_overlaps = 0
+        translation_overlaps = 0
+        found = []
+        for key, translation in zip(keys, translations):
+            notes = []
+            if not pd.isna(key):
+                in_key = contained_keys(key, key)
+                if in_key:
+                    key_overlaps += 1
+                    notes.append("key contains " + ", ".join(in_key))
+            if not pd.isna(translation):
+                in_translation = contained_keys(translation, None if pd.isna(key) else key)
+                if in_translation:
+                    translation_overlaps += 1
+                    notes.append("translation contains " + ", ".join(in_translation))
+            found.append("; ".join(notes))
+        found = pd.Series(found, index=self.df.index, dtype=object)
+        
+        test_note = f"{key_overlaps} keys contain another key, {translation_overlaps} translations contain a key"
+        
+        if key_overlaps + translation_overlaps == 0:
+            test_result = "PASS"
+        
+        else:
+            test_result = "FAIL"
+        
+        self.populate_checks(test_name=test_name, test_result=test_result, test_note=test_note)
+        self.failures[test_name] = found != ""
+        self.expected[test_name] = "no other repl keys"
+        self.found[test_name] = found
+        return self.failures[test_name]
     
-    def save_check_results(self):
+    def violations(self):
         '''
+        One row per failed check per sheet row: which check failed, and what was expected and found.
+        '''
+        columns = ["row", "key", "english", "translation", "check", "expected", "found"]
+        tables = []
+        for test_name, mask in self.failures.items():
+            rows = self.df.index[mask]
+            if rows.size == 0:
+                continue
+            expected = self.expected[test_name]
+            found = self.found[test_name]
+            tables.append(pd.DataFrame({
+                "row": rows,
+                "key": self.df["key"][rows] if "key" in self.df else "",
+                "english": self.df["english"][rows],
+                "translation": self.df["translation"][rows],
+                "check": test_name,
+                "expected": expected[rows] if isinstance(expected, pd.Series) else expected,
+                "found": found[rows] if isinstance(found, pd.Series) else found,
+            }, columns=columns))
         
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(tables).sort_values(["row", "check"], kind="stable").reset_index(drop=True)
+    
+    def save_check_results(self, out_dir="."):
+        '''
+        Writes {type}_scorecard.csv and, if any check failed, {type}_violations.csv with the failing rows,
+        into out_dir.
         '''
         save_df = pd.DataFrame(data = self.scorecard, columns=["Test", "Result", "Notes"])
-        save_df.to_csv(f"{self.type}_scorecard.csv", index=False)
+        save_df.to_csv(os.path.join(out_dir, f"{self.type}_scorecard.csv"), index=False)
         
         result = list(save_df["Result"])
+        violations_file = os.path.join(out_dir, f"{self.type}_violations.csv")
         
         if "FAIL" in result:
-            text = colored(f"[FAIL] {self.file_name} failed one more more of the above tests. The localization script will not be run for {self.type}. \nPlease fix the repl sheet and try again.", 'red', attrs=['reverse'])
+            self.violations().to_csv(violations_file, index=False)
+            text = colored(f"[FAIL] {self.file_name} failed one more more of the above tests. The localization script will not be run for {self.type}. \nPlease fix the repl sheet and try again. The failing rows are listed in {violations_file}.", 'red', attrs=['reverse'])
             print(text)
+        
+        elif os.path.exists(violations_file):
+            os.remove(violations_file)
+
+def check_locale_sheet(locale, repl_file):
+    '''
+    Checks one sheet of one locale and saves its scorecard in the locale directory.
+    Returns the scorecard rows and the printed output.
+    '''
+    with redirect_stdout(io.StringIO()) as output:
+        checker = ReplChecker(repl_file)
+        checker.check_all()
+        print(f"\n[{locale}] {repl_file}")
+        checker.show()
+        checker.save_check_results(out_dir=os.path.dirname(repl_file))
+    
+    return [[locale, checker.type] + row for row in checker.scorecard], output.getvalue()
+
+def check_locales(locales_dir, jobs):
+    '''
+    Checks every <locales_dir>/<locale>/*.csv sheet over a pool of processes and writes
+    the results of all locales as one matrix to <locales_dir>/scorecard_matrix.csv.
+    Returns False, without checking anything, if there are no sheets or a locale has two
+    sheets of one type.
+    '''
+    sheets = []
+    for locale_dir in sorted(glob.glob(os.path.join(locales_dir, "*", ""))):
+        locale = os.path.basename(os.path.normpath(locale_dir))
+        for repl_file in sorted(glob.glob(os.path.join(locale_dir, "*.csv"))):
+            if not repl_file.endswith(("_scorecard.csv", "_violations.csv")):
+                sheets.append((locale, repl_file))
+    
+    if not sheets:
+        print(f"No repl sheets found in {locales_dir}/<locale>/")
+        return False
+    
+    # sheets of one type share the {type}_scorecard.csv of their locale and one row of the matrix.
+    types = {}
+    for locale, repl_file in sheets:
+        types.setdefault((locale, sheet_type(repl_file)), []).append(repl_file)
+    duplicates = {key: files for key, files in types.items() if len(files) > 1}
+    if duplicates:
+        for (locale, type), files in duplicates.items():
+            print(colored(f"[FAIL] {len(files)} {type} sheets in locale {locale}: {', '.join(files)}. "
+                          "Keep one sheet per type in each locale directory.", 'red'))
+        return False
+    
+    with multiprocessing.Pool(min(jobs, len(sheets))) as pool:
+        results = pool.starmap(check_locale_sheet, sheets)
+    
+    scorecards = []
+    for scorecard, output in results:
+        print(output, end="")
+        scorecards.extend(scorecard)
+    
+    scorecard_df = pd.DataFrame(data=scorecards, columns=["Locale", "Sheet", "Test", "Result", "Notes"])
+    matrix = scorecard_df.pivot(index=["Locale", "Sheet"], columns="Test", values="Result").fillna("")
+    matrix.to_csv(os.path.join(locales_dir, "scorecard_matrix.csv"))
+    
+    print("\nALL LOCALES:\n")
+    print(tabulate(matrix.reset_index(), headers="keys", showindex=False))
+    print()
+    return True
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    
+    parser.add_argument('--locales_dir', type=str, required=False, default=None,
+                        help='''Check the sheets of every locale in this directory (<locales_dir>/<locale>/*.csv)
+                        instead of the sheets in repl/. Scorecards are written into each locale directory and a
+                        matrix of all results into <locales_dir>/scorecard_matrix.csv.''')
+    
+    parser.add_argument('--jobs', '-j', type=int, required=False, default=os.cpu_count(),
+                        help="Number of worker processes to check sheets with, when using --locales_dir.")
+    
+    parser.add_argument('--artifact', type=str, required=False, default=None,
+                        help="Compiled repl artifact (see repl_artifact.py) to read the sheets in repl/ from, when it is newer than them.")
+    
+    return parser.parse_args()
 
 if __name__ == "__main__":
     
-    text_checker = ReplChecker(REPL_TEXT_FILE)
-    emoji_checker = ReplChecker(REPL_EMOJI_FILE)
-    values_checker = ReplChecker(REPL_VALUES_FILE)
+    args = get_args()
+    
+    if args.locales_dir is not None:
+        exit(0 if check_locales(args.locales_dir, args.jobs) else 1)
+    
+    artifact = load_artifact(args.artifact)
+    
+    text_checker = ReplChecker(REPL_TEXT_FILE, artifact)
+    emoji_checker = ReplChecker(REPL_EMOJI_FILE, artifact)
+    values_checker = ReplChecker(REPL_VALUES_FILE, artifact)
     
     text_checker.check_all()
     text_checker.show()
@@ -164,8 +361,3 @@ if __name__ == "__main__":
     # values_checker.check_all()
     # values_checker.show()
     # values_checker.save_check_results()
-    
-    
-    
-    
-            
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+import stat
+import shutil
+import tempfile
+
+
+def write_atomic(path, data):
+    '''
+    Writes bytes to path through a temp file in the same directory and a rename.
+    '''
+    with AtomicFile(path, 'wb') as f:
+        f.file.write(data)
+        f.commit()
+
+
+class AtomicFile:
+    '''
+    A file opened for writing at a temp path next to path.
+
+    commit() flushes and fsyncs it and renames it over path (keeping the permissions of
+    path if it exists), so readers see either the old or the new file, never a half
+    written one. If the block is left without commit() the temp file is removed and
+    path is not touched.
+
+    With owner_writable, the new file is writable by its owner even if path was not, e.g.
+    when it replaces a read-only hardlink into a snapshot (see link_tree).
+    '''
+
+    def __init__(self, path, mode='w', owner_writable=False):
+        self.path = path
+        self.mode = mode
+        self.owner_writable = owner_writable
+        self.committed = False
+
+    def __enter__(self):
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".tmp-")
+        self.file = os.fdopen(fd, self.mode)
+        return self
+
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, self.tmp_path)
+        if self.owner_writable:
+            os.chmod(self.tmp_path, stat.S_IMODE(os.stat(self.tmp_path).st_mode) | stat.S_IWUSR)
+        os.replace(self.tmp_path, self.path)
+        self.committed = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.committed:
+            self.file.close()
+            os.remove(self.tmp_path)
+
+
+# ioctl to clone a file's extents into another (a reflink), on filesystems that support it (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def reflink(source, target):
+    import fcntl
+
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def link_tree(source_dir, target_dir, hardlinks=True):
+    '''
+    Makes target_dir a tree of the files in source_dir without copying their data: reflinks
+    (copy-on-write) where the filesystem supports them, else hardlinks, else copies.
+    With hardlinks=False, files that can not be reflinked are copied, so every file of
+    target_dir is independent of source_dir.
+    Symlinks are recreated as symlinks. Returns how many files were made each way.
+
+    Hardlinked files share their content with source_dir, so they have to be written to a new
+    file that is renamed over them (as AtomicFile does), never rewritten in place. They also share
+    its permissions, so a read-only source_dir gives read-only hardlinks, while reflinked and
+    copied files, which are independent of source_dir, are made writable by their owner.
+    '''
+    methods = [("reflink", reflink), ("hardlink", os.link), ("copy", shutil.copy2)]
+    if not hardlinks:
+        methods.remove(("hardlink", os.link))
+    counts = {name: 0 for name, _ in methods}
+
+    for root, dirs, files in os.walk(source_dir):
+        target_root = os.path.join(target_dir, os.path.relpath(root, source_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in dirs + files:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                continue
+            if name in dirs:
+                continue
+            # the first method that works is used for the following files too.
+            while True:
+                method_name, method = methods[0]
+                try:
+                    method(source, target)
+                    if method_name != "hardlink":
+                        os.chmod(target, stat.S_IMODE(os.stat(target).st_mode) | stat.S_IWUSR)
+                    break
+                except (OSError, ImportError):
+                    if len(methods) == 1:
+                        raise
+                    if os.path.lexists(target):
+                        os.remove(target)
+                    methods.pop(0)
+            counts[method_name] += 1
+
+    return counts
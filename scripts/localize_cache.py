@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+from file_utils import write_atomic
+
+CACHE_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class LocalizeCache:
+    '''
+    Content addressed cache of localized files.
+
+    An entry is keyed by the hash of the pristine source file and the fingerprint of the
+    repl sheets (see ReplMatcher.fingerprint), and holds the replacement counts per sheet,
+    the lines each key was found on and the hash of the localized output. Outputs are
+    stored once under objects/<hash>. Files without replacements store no output, since
+    it is the same as the source.
+
+    The cache also keeps an inverted index from each repl key to the files (and lines)
+    it was found in, so a run after a sheet edit can tell which files contain changed keys.
+
+    Layout:
+        <cache_dir>/manifest.json
+        <cache_dir>/index.json
+        <cache_dir>/objects/<sha256>
+    '''
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, OBJECTS_DIR)
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self.entries = {}
+        self.updates = {}
+        self.index_sources = {}
+        self.index_files = {}
+        self.index_updates = {}
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_VERSION:
+                self.entries = manifest["entries"]
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get("version") == CACHE_VERSION:
+                self.index_sources = index["sources"]
+                for key, files in index["keys"].items():
+                    for path, lines in files.items():
+                        self.index_files.setdefault(path, {})[key] = lines
+
+    @staticmethod
+    def entry_key(source_hash, fingerprint):
+        return f"{source_hash}:{fingerprint}"
+
+    def lookup(self, source_hash, fingerprints):
+        '''
+        Looks the file up under each fingerprint in turn. An entry found under a later
+        fingerprint is copied to the first one.
+        Returns (output bytes or None if unchanged, counts, key lines) for a cached file, or None on a miss.
+        '''
+        for fingerprint in fingerprints:
+            key = self.entry_key(source_hash, fingerprint)
+            entry = self.updates.get(key) or self.entries.get(key)
+            if entry is None:
+                continue
+            if entry["output"] is not None and not os.path.exists(os.path.join(self.objects_dir, entry["output"])):
+                continue
+
+            self.hits += 1
+            self.updates[self.entry_key(source_hash, fingerprints[0])] = entry
+            if entry["output"] is None:
+                return None, entry["counts"], entry["keys"]
+
+            with open(os.path.join(self.objects_dir, entry["output"]), 'rb') as f:
+                return f.read(), entry["counts"], entry["keys"]
+
+        self.misses += 1
+        return None
+
+    def store(self, source_hash, fingerprint, output, counts, occurrences):
+        '''
+        Stores the localized output (None if it is the same as the source), its counts and key lines.
+        '''
+        output_hash = None
+        if output is not None:
+            output_hash = content_hash(output)
+            object_path = os.path.join(self.objects_dir, output_hash)
+            if not os.path.exists(object_path):
+                write_atomic(object_path, output)
+
+        self.updates[self.entry_key(source_hash, fingerprint)] = {
+            "output": output_hash, "counts": counts, "keys": occurrences
+        }
+
+    def record(self, path, source_hash, occurrences):
+        '''
+        Adds a file and the lines its keys were found on to the index.
+        '''
+        self.index_updates[str(path)] = (source_hash, occurrences)
+
+    def indexed_source(self, path):
+        '''
+        Hash of the file at path when it was last indexed, or None.
+        '''
+        return self.index_sources.get(str(path))
+
+    def files_with_keys(self, keys):
+        '''
+        Paths of the indexed files that contain any of keys.
+        '''
+        keys = set(keys)
+        return set(path for path, occurrences in self.index_files.items() if not keys.isdisjoint(occurrences))
+
+    def take_updates(self):
+        '''
+        Returns the entries, index updates and stats collected since the last call, and resets them.
+        '''
+        updates = (self.updates, self.index_updates, self.hits, self.misses)
+        self.updates, self.index_updates, self.hits, self.misses = {}, {}, 0, 0
+        return updates
+
+    def merge(self, updates, index_updates, hits, misses):
+        '''
+        Adds the entries, index updates and stats collected by a worker process.
+        '''
+        self.updates.update(updates)
+        self.index_updates.update(index_updates)
+        self.hits += hits
+        self.misses += misses
+
+    def save(self):
+        self.entries.update(self.updates)
+        self.updates = {}
+        manifest = {"version": CACHE_VERSION, "entries": self.entries}
+        write_atomic(self.manifest_path, json.dumps(manifest).encode())
+
+        for path, (source_hash, occurrences) in self.index_updates.items():
+            self.index_sources[path] = source_hash
+            self.index_files[path] = occurrences
+        self.index_updates = {}
+
+        keys = {}
+        for path, occurrences in self.index_files.items():
+            for key, lines in occurrences.items():
+                keys.setdefault(key, {})[path] = lines
+        index = {"version": CACHE_VERSION, "sources": self.index_sources, "keys": keys}
+        write_atomic(self.index_path, json.dumps(index).encode())
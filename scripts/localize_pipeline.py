@@ -0,0 +1,406 @@
+import os
+import re
+import sys
+import time
+import json
+import stat
+import shutil
+import traceback
+import asyncio
+import hashlib
+import tarfile
+import argparse
+from tabulate import tabulate
+from termcolor import colored
+
+from file_utils import link_tree
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+
+APP_REPO = "https://github.com/gameqa/app-is.git"
+API_REPO = "https://github.com/gameqa/api-is.git"
+
+SCORECARDS = ["text_scorecard.csv", "emoji_scorecard.csv", "values_scorecard.csv"]
+
+
+class StageError(Exception):
+    pass
+
+
+class Stage:
+    '''
+    One step of the pipeline. action is an async function returning the output of the step,
+    and raising StageError if it failed. The stage starts once every stage in needs succeeded.
+    '''
+
+    def __init__(self, name, action, needs=()):
+        self.name = name
+        self.action = action
+        self.needs = list(needs)
+        self.status = "PENDING"
+        self.output = ""
+        self.start = None
+        self.end = None
+
+
+async def run_command(*argv, cwd=ROOT_DIR):
+    '''
+    Runs a command and returns its output (stdout and stderr together).
+    '''
+    process = await asyncio.create_subprocess_exec(*argv, cwd=cwd, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.STDOUT)
+    output, _ = await process.communicate()
+    output = output.decode(errors="replace")
+
+    if process.returncode != 0:
+        raise StageError(f"{' '.join(argv)} exited with {process.returncode}\n{output}")
+
+    return output
+
+
+class LocalizePipeline:
+    '''
+    Runs the stages as a DAG: every stage starts as soon as the stages it needs are done,
+    so independent branches (e.g. cloning the app and the api) run concurrently.
+
+    The output of a stage is printed in one piece when it finishes, so outputs do not interleave.
+    If a stage fails, the stages that need it are skipped and the rest still run.
+    '''
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for need in stage.needs:
+                if need not in self.stages:
+                    raise ValueError(f"Stage {stage.name} needs unknown stage {need}")
+        self.tasks = {}
+        self.start = None
+
+    async def run_stage(self, stage):
+        needs_ok = [await self.tasks[need] for need in stage.needs]
+
+        if not all(needs_ok):
+            stage.status = "SKIPPED"
+            return False
+
+        print(f"\n[{stage.name.upper()}...]")
+        stage.start = time.perf_counter() - self.start
+        try:
+            stage.output = await stage.action()
+            stage.status = "DONE"
+        except StageError as e:
+            stage.output = str(e)
+            stage.status = "FAILED"
+        except Exception:
+            # anything else (OSError, a missing git, ...) fails only this stage, like a StageError.
+            stage.output = traceback.format_exc()
+            stage.status = "FAILED"
+        stage.end = time.perf_counter() - self.start
+
+        color = "green" if stage.status == "DONE" else "red"
+        print(colored(f"\n[{stage.name.upper()} {stage.status} in {stage.end - stage.start:.1f}s]", color))
+        print(stage.output, end="")
+
+        return stage.status == "DONE"
+
+    async def run_all(self):
+        self.start = time.perf_counter()
+        # tasks are created before any of them runs, so every stage can await the ones it needs.
+        for name, stage in self.stages.items():
+            self.tasks[name] = asyncio.ensure_future(self.run_stage(stage))
+        await asyncio.gather(*self.tasks.values())
+
+    def run(self):
+        asyncio.run(self.run_all())
+        self.show_report()
+        return all(stage.status == "DONE" for stage in self.stages.values())
+
+    def show_report(self):
+        rows = []
+        for stage in self.stages.values():
+            if stage.start is None:
+                rows.append([stage.name, stage.status, ", ".join(stage.needs), "", ""])
+            else:
+                rows.append([stage.name, stage.status, ", ".join(stage.needs), f"{stage.start:.1f}",
+                             f"{stage.end - stage.start:.1f}"])
+
+        total = time.perf_counter() - self.start
+        print(f"\nPIPELINE RESULT ({total:.1f}s):\n")
+        print(tabulate(rows, headers=["Stage", "Status", "Needs", "Started (s)", "Took (s)"]))
+        print()
+
+
+def clone(repo, branch, target):
+    '''
+    Clones branch of repo into target, without its git history.
+    repo can be a url or a path to a local (bare) repository.
+    '''
+    async def action():
+        output = await run_command("git", "clone", "--branch", branch, "--single-branch", repo, target)
+        shutil.rmtree(os.path.join(target, ".git"))
+        return output
+    return action
+
+
+def mirror_path(mirror_dir, repo):
+    '''
+    Where the mirror of repo is kept: its name plus a hash of the url, so different remotes
+    with the same name do not share a mirror.
+    '''
+    name = re.sub(r"\.git$", "", os.path.basename(repo.rstrip("/")))
+    name = re.sub(r"[^\w.-]", "_", name)
+    return os.path.join(mirror_dir, f"{name}-{hashlib.sha1(repo.encode()).hexdigest()[:8]}.git")
+
+
+def extract_archive(archive, target):
+    with tarfile.open(archive) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(target, filter="data")
+        else:
+            tar.extractall(target)
+
+
+def snapshot_files(snapshot):
+    '''
+    Size and modification time of every regular file in snapshot, by relative path.
+    '''
+    files = {}
+    for root, _, names in os.walk(snapshot):
+        for name in names:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                st = os.stat(path)
+                files[os.path.relpath(path, snapshot)] = [st.st_size, st.st_mtime_ns]
+    return files
+
+
+def seal_snapshot(snapshot):
+    '''
+    Makes the files of snapshot read-only, so writing in place to a tree hardlinked to it fails
+    instead of changing the snapshot, and records their sizes and modification times in
+    snapshot.json for snapshot_intact.
+    '''
+    for root, _, names in os.walk(snapshot):
+        for name in names:
+            path = os.path.join(root, name)
+            if not os.path.islink(path):
+                os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+    with open(f"{snapshot}.json", "w") as f:
+        json.dump(snapshot_files(snapshot), f)
+
+
+def snapshot_intact(snapshot):
+    '''
+    Whether the files of snapshot are still the ones seal_snapshot recorded. Read-only files do
+    not stop root, so a changed size or modification time means the snapshot was written to.
+    '''
+    try:
+        with open(f"{snapshot}.json") as f:
+            return json.load(f) == snapshot_files(snapshot)
+    except (OSError, ValueError):
+        return False
+
+
+async def export_snapshot(mirror, commit, snapshot):
+    '''
+    Exports commit of mirror into the directory snapshot (through a temp directory that is
+    renamed into place, so an interrupted export is never taken for a pristine snapshot).
+    The snapshot is sealed (see seal_snapshot) before it is renamed into place.
+    '''
+    tmp_snapshot = f"{snapshot}.tmp"
+    archive = f"{snapshot}.tar"
+    shutil.rmtree(tmp_snapshot, ignore_errors=True)
+    try:
+        await run_command("git", "--git-dir", mirror, "archive", "--format=tar", "-o", archive, commit)
+        os.makedirs(tmp_snapshot)
+        await asyncio.to_thread(extract_archive, archive, tmp_snapshot)
+        await asyncio.to_thread(seal_snapshot, tmp_snapshot)
+        os.replace(f"{tmp_snapshot}.json", f"{snapshot}.json")
+        os.replace(tmp_snapshot, snapshot)
+    finally:
+        if os.path.exists(f"{tmp_snapshot}.json"):
+            os.remove(f"{tmp_snapshot}.json")
+        if os.path.exists(archive):
+            os.remove(archive)
+        shutil.rmtree(tmp_snapshot, ignore_errors=True)
+
+
+def clone_from_mirror(repo, branch, target, mirror_dir, hardlinks=True):
+    '''
+    Like clone, through a mirror of repo kept in mirror_dir. The first run makes the mirror with
+    git clone --mirror, later runs only fetch what changed.
+
+    The branch is exported once per commit into a pristine snapshot next to the mirrors, and
+    target is made of links to the snapshot files (see file_utils.link_tree), so staging a
+    tree copies no data. The localizer only breaks the links of the files it changes.
+    Hardlinks share the read-only mode of the snapshot files; with hardlinks=False, files
+    that can not be reflinked are copied instead, so every file of target is writable.
+    '''
+    async def action():
+        mirror = mirror_path(mirror_dir, repo)
+        if os.path.exists(mirror):
+            output = await run_command("git", "--git-dir", mirror, "fetch", "--prune", "origin")
+            output = f"Updated mirror {mirror}\n{output}"
+        else:
+            os.makedirs(mirror_dir, exist_ok=True)
+            output = await run_command("git", "clone", "--mirror", repo, mirror)
+
+        commit = (await run_command("git", "--git-dir", mirror, "rev-parse", f"{branch}^{{commit}}")).strip()
+
+        snapshots_dir = os.path.join(mirror_dir, "snapshots")
+        prefix = f"{os.path.basename(mirror)[:-len('.git')]}-{branch.replace('/', '_')}-"
+        snapshot = os.path.join(snapshots_dir, prefix + commit[:12])
+
+        if os.path.exists(snapshot) and await asyncio.to_thread(snapshot_intact, snapshot):
+            output += f"Reusing snapshot of {branch} ({commit[:7]})\n"
+        else:
+            if os.path.exists(snapshot):
+                output += f"The snapshot of {branch} ({commit[:7]}) was changed, exporting it again\n"
+                shutil.rmtree(snapshot)
+            os.makedirs(snapshots_dir, exist_ok=True)
+            await export_snapshot(mirror, commit, snapshot)
+            output += f"Exported {branch} ({commit[:7]}) into {snapshot}\n"
+            # older snapshots of the branch; trees staged from them keep their files through the links.
+            for name in os.listdir(snapshots_dir):
+                old_snapshot = os.path.join(snapshots_dir, name)
+                if name.startswith(prefix) and old_snapshot != snapshot and os.path.isdir(old_snapshot):
+                    shutil.rmtree(old_snapshot)
+                    if os.path.exists(f"{old_snapshot}.json"):
+                        os.remove(f"{old_snapshot}.json")
+
+        counts = await asyncio.to_thread(link_tree, snapshot, target, hardlinks)
+        made = ", ".join(f"{count} {'copies' if method == 'copy' else method + 's'}" for method, count in counts.items() if count)
+        return output + f"Staged {target} ({made or 'no files'})\n"
+    return action
+
+
+def copy_tree(source, target):
+    '''
+    Copies source (relative to the repo root) into target, so it is localized without
+    touching the checked-in files.
+    '''
+    async def action():
+        await asyncio.to_thread(shutil.copytree, source, target)
+        return f"Copied {source} into {target}\n"
+    return action
+
+
+def localize(target, cache_dir, sheets, include=()):
+    async def action():
+        argv = [sys.executable, os.path.join(SCRIPTS_DIR, "localizer.py"), "--dir", target, "-v"]
+        if cache_dir is not None:
+            argv += ["--cache_dir", cache_dir]
+        for pattern in include:
+            argv += ["--include", pattern]
+        for sheet in sheets:
+            argv += ["--sheet"] + list(sheet)
+        return await run_command(*argv)
+    return action
+
+
+def check_sheets():
+    async def action():
+        return await run_command(sys.executable, os.path.join(SCRIPTS_DIR, "check_repl_sheet.py"))
+    return action
+
+
+def build_stages(args):
+    app_dir = os.path.join(args.out_dir, "app")
+    api_dir = os.path.join(args.out_dir, "api")
+
+    sendgrid_dir = os.path.join(args.out_dir, "sendgrid_templates")
+
+    # the values sheet is left out until check_repl_sheet.py checks it (it writes no values scorecard yet).
+    sheets = [("repl/repl_text.csv", "key", "translation"),
+              ("repl/repl_emoji.csv", "key", "translation")]
+
+    def cache_dir(name):
+        # one cache per tree, so concurrent localizer runs do not write the same index.
+        return os.path.join(args.cache_dir, name) if args.cache_dir is not None else None
+
+    def clone_stage(repo, branch, target):
+        if args.no_mirror:
+            return clone(repo, branch, target)
+        return clone_from_mirror(repo, branch, target, args.mirror_dir, hardlinks=not args.writable_copy)
+
+    stages = [
+        Stage("clone app", clone_stage(args.app_repo, args.app_branch, app_dir)),
+        Stage("clone api", clone_stage(args.api_repo, args.api_branch, api_dir)),
+        Stage("check sheets", check_sheets()),
+        Stage("localize app", localize(app_dir, cache_dir("app"), sheets), needs=["clone app", "check sheets"]),
+        Stage("localize api", localize(api_dir, cache_dir("api"), sheets), needs=["clone api", "check sheets"]),
+    ]
+
+    if args.sendgrid:
+        stages += [
+            Stage("copy sendgrid templates", copy_tree("sendgrid_templates", sendgrid_dir)),
+            Stage("localize sendgrid templates",
+                  localize(sendgrid_dir, cache_dir("sendgrid_templates"), sheets, include=["*.html"]),
+                  needs=["copy sendgrid templates", "check sheets"]),
+        ]
+
+    return stages
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--app_repo', type=str, default=APP_REPO,
+                        help="url or path of the app repository (a local bare repository works too)")
+
+    parser.add_argument('--app_branch', type=str, default="localize")
+
+    parser.add_argument('--api_repo', type=str, default=API_REPO,
+                        help="url or path of the api repository (a local bare repository works too)")
+
+    parser.add_argument('--api_branch', type=str, default="localization")
+
+    parser.add_argument('--out_dir', type=str, default="localized-app",
+                        help="directory to clone and localize the app and api into. It is emptied first.")
+
+    parser.add_argument('--cache_dir', type=str, default=".localize-cache",
+                        help="localizer cache directory, with one cache per localized tree")
+
+    parser.add_argument('--mirror_dir', type=str, default=".repo-mirrors",
+                        help="where mirrors of the app and api repositories are kept between runs")
+
+    parser.add_argument('--no_mirror', default=False, action='store_true',
+                        help="clone the app and api afresh instead of through the mirrors")
+
+    parser.add_argument('--writable_copy', default=False, action='store_true',
+                        help="""stage the app and api as writable copies of the snapshots. By default files
+                        that are not localized are read-only hardlinks into the snapshots (unless the
+                        filesystem supports reflinks), so they can not be edited in place.""")
+
+    parser.add_argument('--sendgrid', default=False, action='store_true',
+                        help="also localize a copy of the sendgrid templates, in out_dir/sendgrid_templates")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+
+    args = get_args()
+
+    # paths given relative to where the script was started from; the stages run from the repo root.
+    for name in ["app_repo", "api_repo"]:
+        if os.path.exists(getattr(args, name)):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    args.out_dir = os.path.abspath(args.out_dir)
+    args.mirror_dir = os.path.abspath(args.mirror_dir)
+    if args.cache_dir is not None:
+        args.cache_dir = os.path.abspath(args.cache_dir)
+    os.chdir(ROOT_DIR)
+
+    shutil.rmtree(args.out_dir, ignore_errors=True)
+    os.makedirs(args.out_dir)
+
+    pipeline = LocalizePipeline(build_stages(args))
+    succeeded = pipeline.run()
+
+    for scorecard in SCORECARDS:
+        if os.path.exists(scorecard):
+            os.remove(scorecard)
+
+    exit(0 if succeeded else 1)
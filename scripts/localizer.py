@@ -0,0 +1,670 @@
+import io
+import os
+import mmap
+import argparse
+import multiprocessing
+from pathlib import Path
+from contextlib import redirect_stdout
+from tabulate import tabulate
+from termcolor import colored
+from repl_matcher import ReplMatcher
+from localize_cache import LocalizeCache, content_hash
+from file_utils import AtomicFile
+from repl_sheet import read_sheet
+from repl_artifact import load_artifact
+from ts_lexer import literal_spans
+
+# characters read at a time by --stream
+STREAM_CHUNK_SIZE = 1 << 20
+
+worker_localizer = None
+
+def init_worker(localizer):
+    '''
+    Keeps the localizer (and its compiled matcher) in the worker process.
+    '''
+    global worker_localizer
+    worker_localizer = localizer
+
+def replace_text_in_worker(file_path):
+    '''
+    Localizes one file in a worker and returns its log rows, counts, cache updates and printed output.
+    '''
+    worker_localizer.repl_log = []
+    worker_localizer.total_succeeds = 0
+    worker_localizer.total_failures = 0
+    worker_localizer.skipped_files = []
+    worker_localizer.prefilter_scanned = 0
+    worker_localizer.prefilter_hits = 0
+    worker_localizer.sheet_succeeds = dict.fromkeys(worker_localizer.sheet_succeeds, 0)
+    cache = worker_localizer.cache
+    if cache is not None:
+        cache.take_updates()
+
+    with redirect_stdout(io.StringIO()) as output:
+        worker_localizer.replace_text_in_file(file_path)
+
+    return {
+        "repl_log": worker_localizer.repl_log,
+        "total_succeeds": worker_localizer.total_succeeds,
+        "total_failures": worker_localizer.total_failures,
+        "skipped_files": worker_localizer.skipped_files,
+        "prefilter": (worker_localizer.prefilter_scanned, worker_localizer.prefilter_hits),
+        "sheet_succeeds": worker_localizer.sheet_succeeds,
+        "cache": cache.take_updates() if cache is not None else None,
+        "output": output.getvalue(),
+    }
+
+def sheet_label(repl_file):
+    '''
+    Name of the sheet in reports and scorecards: text, emoji or values (same as ReplChecker).
+    '''
+    name = Path(repl_file).stem
+    for label in ["text", "emoji", "values"]:
+        if label in name:
+            return label
+    return name
+
+class Localizer:
+    '''
+    Replaces keys from one or more repl sheets in every *.ts[x] file (or the files matching args.include).
+
+    args.sheets is a list of (repl_file, key, repl) specs. The sheets are combined into one
+    ordered matcher, so each file is read and written once, no matter how many sheets are used.
+    '''
+
+    def __init__(self, args):
+        self.repl_log = []
+        self.total_succeeds = 0
+        self.total_failures = 0
+        self.skipped_files = []
+        self.prefilter_scanned = 0
+        self.prefilter_hits = 0
+        self.args = args
+        self.sheets = args.sheets
+        self.labels = [sheet_label(repl_file) for repl_file, _, _ in self.sheets]
+        self.sheet_succeeds = dict.fromkeys(self.labels, 0)
+        if args.file is None:
+            # a file matching more than one pattern is localized once
+            self.files = list(dict.fromkeys(file for pattern in args.include for file in Path(args.dir).rglob(pattern)))
+        else:
+            self.files = [args.file]
+        artifact = load_artifact(args.artifact, args.verbose)
+        if artifact is not None and artifact.matches(self.sheets, cascading=not args.non_cascading):
+            if args.verbose:
+                print(f"loading repl sheets from {args.artifact}")
+            self.repl_dicts = artifact.repl_dicts()
+            self.matcher = self.build_matcher(artifact.compiled_state())
+        else:
+            if artifact is not None:
+                print(f"{args.artifact} is older than the repl sheets or was compiled from others, reading the sheets.")
+            self.repl_dicts = [self.build_repl_dict(self.load_sheet(repl_file), key, repl)
+                               for repl_file, key, repl in self.sheets]
+            self.matcher = self.build_matcher()
+        # cached output depends on where keys are replaced as well as on the sheets, and in
+        # literals mode on whether the file is lexed as TSX, by jsx.
+        if args.literals_only:
+            self.fingerprints = {jsx: content_hash(f"{self.matcher.fingerprint}:literals_only:{jsx}".encode())
+                                 for jsx in [False, True]}
+        else:
+            self.fingerprints = dict.fromkeys([False, True], self.matcher.fingerprint)
+        self.cache = LocalizeCache(args.cache_dir) if args.cache_dir is not None else None
+        self.changes = self.load_changes() if args.changed_since else None
+
+    def build_repl_dict(self, sheet, key, repl):
+        '''
+        Builds a disctionary for replacement.
+        Replace keys with values.
+
+        TODO: Check to make sure that there are no double quotes.
+        '''
+
+        src = sheet[key]
+        repls = sheet[repl]
+
+        if self.args.verbose:
+            print("building repl dictionary...")
+
+        repl_dict = {key: val for key, val in zip(src, repls)}
+
+        if self.args.verbose:
+            print("Built repl dictionary.")
+
+        return repl_dict
+
+    def build_matcher(self, compiled=None):
+        '''
+        Combines the repl dictionaries, in the order of the sheets, into one matcher.
+        '''
+        entries = []
+        for label, repl_dict in zip(self.labels, self.repl_dicts):
+            entries.extend((key, val, label) for key, val in repl_dict.items())
+
+        return ReplMatcher(entries, cascading=not self.args.non_cascading, compiled=compiled)
+
+    def load_changes(self):
+        '''
+        Diffs the old sheets given with --changed_since against the current ones.
+
+        A file that was indexed with the same content and contains none of the changed keys
+        is localized the same way by the old and the new sheets, so its cached output under
+        the old fingerprint can be reused. This only holds for a single pass, so sheets that
+        need the ordered (cascading) loop are fully relocalized.
+        '''
+        old_sheets = {sheet_label(old_file): old_file for old_file in self.args.changed_since}
+
+        entries = []
+        for label, (repl_file, key, repl), repl_dict in zip(self.labels, self.sheets, self.repl_dicts):
+            if label in old_sheets:
+                repl_dict = self.build_repl_dict(self.load_sheet(old_sheets[label]), key, repl)
+            entries.extend((k, v, label) for k, v in repl_dict.items())
+
+        old_matcher = ReplMatcher(entries, cascading=self.matcher.cascading)
+
+        if self.matcher.cascading and not (self.matcher.cascade_free and old_matcher.cascade_free):
+            print("The repl sheets are not cascade free, relocalizing every file.")
+            return None
+
+        old_dict = old_matcher.repl_dict
+        new_dict = self.matcher.repl_dict
+        changed_keys = [key for key in old_dict.keys() | new_dict.keys() if old_dict.get(key) != new_dict.get(key)]
+        added_keys = [key for key in new_dict.keys() - old_dict.keys()]
+
+        changed_files = self.cache.files_with_keys(changed_keys)
+
+        if self.args.verbose:
+            print(f"{len(changed_keys)} changed repl keys ({len(added_keys)} new), "
+                  f"found in {len(changed_files)} indexed files.")
+
+        return {
+            "fingerprint": old_matcher.fingerprint,
+            "changed_files": changed_files,
+            # new keys are not in the index yet, so files are searched for them.
+            "added_matcher": ReplMatcher.from_dict({key: new_dict[key] for key in added_keys}),
+        }
+
+    def is_unaffected(self, source_file, source_hash, content):
+        '''
+        True if the file was indexed with the same content and contains none of the changed keys.
+        '''
+        added_pattern = self.changes["added_matcher"].pattern
+        return (self.cache.indexed_source(source_file) == source_hash
+                and str(source_file) not in self.changes["changed_files"]
+                and (added_pattern is None or not added_pattern.search(content)))
+
+    def load_sheet(self, repl_file):
+        '''
+        Read sheet as csv and return.
+        '''
+
+        if self.args.verbose:
+            print(f'loading repl sheet {repl_file}...')
+
+        sheet = read_sheet(repl_file)
+
+        if self.args.verbose:
+            print('loaded repl sheet')
+
+        return sheet
+
+    def replace_text_in_string(self, text, occurrences=None, jsx=False):
+        '''
+        replaces occurances of the repl keys with values in string and returns it,
+        along with the replacement count per sheet.
+        '''
+        if self.args.literals_only:
+            return self.replace_text_in_literals(text, occurrences, jsx)
+        return self.matcher.replace_counted(text, occurrences)
+
+    def replace_text_in_literals(self, text, occurrences=None, jsx=False):
+        '''
+        Like replace_text_in_string, but only inside string literals, template literal text and
+        JSX text (with jsx=True, for .tsx files). The file is lexed once, and only the literals
+        that contain a key are replaced.
+        '''
+        counts = dict.fromkeys(self.labels, 0)
+        pattern = self.matcher.pattern
+
+        if pattern is None or not pattern.search(text):
+            return text, counts
+
+        parts = []
+        last = 0
+        # line_number is the line of text[counted]
+        line_number, counted = 1, 0
+        for start, end in literal_spans(text, jsx):
+            if not pattern.search(text, start, end):
+                continue
+
+            literal_occurrences = {} if occurrences is not None else None
+            literal, literal_counts = self.matcher.replace_counted(text[start:end], literal_occurrences)
+
+            for label, count in literal_counts.items():
+                counts[label] += count
+            if occurrences is not None:
+                line_number += text.count("\n", counted, start)
+                counted = start
+                for key, lines in literal_occurrences.items():
+                    occurrences.setdefault(key, []).extend(line_number + line - 1 for line in lines)
+
+            parts.append(text[last:start])
+            parts.append(literal)
+            last = end
+
+        parts.append(text[last:])
+        return "".join(parts), counts
+
+    def replace_text_in_file(self, source_file):
+        '''
+        Performs replacements in source_file, and writes into target_file.
+        Source and target are the same by default, but can be specified to be different.
+        '''
+
+        if self.args.very_verbose:
+            print(f"Replacing text in file: {source_file}...")
+
+        try:
+            if self.use_prefilter() and not self.prefilter(source_file):
+                self.skipped_files.append(source_file)
+                return
+
+            if self.args.stream:
+                sheet_counts = self.replace_text_in_file_streaming(source_file)
+            elif self.use_mmap():
+                sheet_counts = self.replace_text_in_file_mmap(source_file)
+            else:
+                sheet_counts = self.replace_text_in_file_in_memory(source_file)
+
+            file_repl_count = sum(sheet_counts.values())
+
+            if file_repl_count > 0:
+                self.total_succeeds += file_repl_count
+                for label, count in sheet_counts.items():
+                    self.sheet_succeeds[label] += count
+                self.repl_log.append(self.log_row(source_file, sheet_counts))
+
+        # TODO: How do you want to handle this?
+        except Exception as e:
+            print(f"Error with file {source_file}. Skipping.")
+            print("========================")
+            print("Error Message:")
+            print(e)
+            print("========================")
+
+            log_row = [source_file] + ["ERROR"] * len(self.log_headers()[1:])
+            self.total_failures += 1
+            self.repl_log.append(log_row)
+
+    def use_prefilter(self):
+        # --mmap already scans the raw bytes once.
+        return not self.args.no_prefilter and not self.use_mmap() and self.matcher.byte_pattern is not None
+
+    def use_mmap(self):
+        single_pass = not self.matcher.cascading or self.matcher.cascade_free
+        return self.args.mmap and single_pass and self.matcher.byte_pattern is not None
+
+    def prefilter(self, source_file):
+        '''
+        Searches the raw bytes of source_file (memory-mapped) for any repl key.
+        Returns False if there is none, so the file does not need to be decoded and localized.
+        '''
+        self.prefilter_scanned += 1
+
+        with open(source_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                buffer = b""
+            else:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            try:
+                hit = self.matcher.byte_pattern.search(buffer) is not None
+
+                # files without keys stay in the index, with no keys.
+                if not hit and self.cache is not None:
+                    self.cache.record(source_file, content_hash(buffer), {})
+            finally:
+                if type(buffer) == mmap.mmap:
+                    buffer.close()
+
+        self.prefilter_hits += hit
+        return hit
+
+    def replace_text_in_file_in_memory(self, source_file):
+        '''
+        Reads the whole file, replaces (or takes the result from the cache) and writes it back.
+        Returns the replacement count per sheet.
+        '''
+        with open(source_file, 'rb') as f:
+            data = f.read()
+
+        content = io.TextIOWrapper(io.BytesIO(data)).read()
+
+        jsx = Path(source_file).suffix == ".tsx"
+        fingerprint = self.fingerprints[jsx]
+
+        cached = None
+        if self.cache is not None:
+            source_hash = content_hash(data)
+            fingerprints = [fingerprint]
+            if self.changes is not None and self.is_unaffected(source_file, source_hash, content):
+                fingerprints.append(self.changes["fingerprint"])
+            cached = self.cache.lookup(source_hash, fingerprints)
+
+        if cached is not None:
+            output, sheet_counts, occurrences = cached
+            new_content = content if output is None else output.decode()
+        else:
+            occurrences = {}
+            new_content, sheet_counts = self.replace_text_in_string(content, occurrences, jsx)
+
+        file_repl_count = sum(sheet_counts.values())
+
+        if self.cache is not None:
+            if cached is None:
+                output = new_content.encode() if file_repl_count > 0 else None
+                self.cache.store(source_hash, fingerprint, output, sheet_counts, occurrences)
+            self.cache.record(source_file, source_hash, occurrences)
+
+        if new_content == content:
+            self.skipped_files.append(source_file)
+            return sheet_counts
+
+        if self.args.very_verbose:
+            print(f"  Replaced. Writing new text in file: {source_file}")
+
+        self.write_file(source_file, new_content)
+
+        return sheet_counts
+
+    def write_file(self, source_file, content):
+        '''
+        Writes the localized content of source_file. A hardlinked file (see file_utils.link_tree)
+        is written to a new file that is renamed over it, so the other links keep the pristine content,
+        and which is writable by its owner even though the snapshot files are read-only.
+        '''
+        if os.stat(source_file).st_nlink > 1:
+            with AtomicFile(str(source_file), owner_writable=True) as target:
+                target.file.write(content)
+                target.commit()
+        else:
+            with open(source_file, 'w') as f:
+                f.write(content)
+
+    def replace_text_in_file_mmap(self, source_file):
+        '''
+        Scans the memory-mapped file with the byte level keys and, if something was replaced,
+        writes the unchanged spans straight from the map plus the replacement bytes through
+        a temp file that is renamed over source_file. No str is built for the file content.
+        Returns the replacement count per sheet.
+        '''
+        with open(source_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self.skipped_files.append(source_file)
+                return dict.fromkeys(self.labels, 0)
+
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            parts = None
+            try:
+                parts, sheet_counts = self.matcher.replace_bytes(buffer)
+
+                if sum(sheet_counts.values()) > 0:
+                    if self.args.very_verbose:
+                        print(f"  Replaced. Writing new text in file: {source_file}")
+                    with AtomicFile(str(source_file), 'wb', owner_writable=True) as target:
+                        target.file.writelines(parts)
+                        target.commit()
+                else:
+                    self.skipped_files.append(source_file)
+            finally:
+                # the slices must be gone before the map can be closed, also when writing
+                # failed, or closing raises a BufferError that hides the error.
+                parts = None
+                buffer.close()
+
+        return sheet_counts
+
+    def replace_text_in_file_streaming(self, source_file):
+        '''
+        Replaces chunk by chunk into a temp file next to source_file, so memory does not grow
+        with the file size. The temp file is fsync'd and renamed over source_file only if
+        something was replaced; otherwise source_file is left untouched.
+        Without the prefilter, the file is first scanned read-only, so a file without keys
+        costs no temp file. Returns the replacement count per sheet.
+        '''
+        if not self.use_prefilter():
+            with open(source_file, 'r') as source:
+                if not self.matcher.search_stream(source, STREAM_CHUNK_SIZE):
+                    self.skipped_files.append(source_file)
+                    return dict.fromkeys(self.labels, 0)
+
+        with open(source_file, 'r') as source, AtomicFile(str(source_file), owner_writable=True) as target:
+            sheet_counts = self.matcher.replace_stream(source, target.file, STREAM_CHUNK_SIZE)
+
+            if sum(sheet_counts.values()) > 0:
+                if self.args.very_verbose:
+                    print(f"  Replaced. Writing new text in file: {source_file}")
+                target.commit()
+            else:
+                self.skipped_files.append(source_file)
+
+        return sheet_counts
+
+    def replace_text_all(self):
+
+        if self.args.jobs > 1 and len(self.files) > 1:
+            self.replace_text_all_parallel()
+        else:
+            for file_path in self.files:
+                self.replace_text_in_file(file_path)
+
+        if self.cache is not None:
+            self.cache.save()
+
+    def replace_text_all_parallel(self):
+        '''
+        Spreads the files over a pool of self.args.jobs processes.
+        Results are merged back in file order, so the report is the same as a serial run.
+        '''
+        chunksize = max(1, len(self.files) // (self.args.jobs * 4))
+
+        # workers inherit the compiled matcher through fork; other start methods have to
+        # pickle it, which recompiles its regexes in every worker.
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+
+        with context.Pool(self.args.jobs, initializer=init_worker, initargs=(self,)) as pool:
+            results = pool.imap(replace_text_in_worker, self.files, chunksize=chunksize)
+            for result in results:
+                print(result["output"], end="")
+                self.repl_log.extend(result["repl_log"])
+                self.total_succeeds += result["total_succeeds"]
+                self.total_failures += result["total_failures"]
+                self.skipped_files.extend(result["skipped_files"])
+                self.prefilter_scanned += result["prefilter"][0]
+                self.prefilter_hits += result["prefilter"][1]
+                for label, count in result["sheet_succeeds"].items():
+                    self.sheet_succeeds[label] += count
+                if result["cache"] is not None:
+                    self.cache.merge(*result["cache"])
+
+    def log_headers(self):
+        if len(self.labels) == 1:
+            return ["FILE NAME", "Replacement Count"]
+        return ["FILE NAME"] + [label.upper() for label in self.labels] + ["Replacement Count"]
+
+    def log_row(self, source_file, sheet_counts):
+        if len(self.labels) == 1:
+            return [source_file, sum(sheet_counts.values())]
+        return [source_file] + list(sheet_counts.values()) + [sum(sheet_counts.values())]
+
+    def show_report(self):
+        print(f"\n{' + '.join(self.labels).upper()} LOCALIZATION RESULT:\n")
+        print(tabulate(self.repl_log, headers=self.log_headers()))
+
+        if self.args.very_verbose and self.skipped_files:
+            print("\nUNCHANGED FILES (NOT WRITTEN):\n")
+            print(tabulate([[file_path] for file_path in self.skipped_files], headers=["FILE NAME"]))
+
+        collective_data = []
+        if len(self.labels) > 1:
+            for label in self.labels:
+                collective_data.append([f"{label.upper()} REPLACEMENTS", self.sheet_succeeds[label]])
+        collective_data.append(["TOTAL SUCCESSFUL REPLACEMENTS", self.total_succeeds])
+        collective_data.append(["TOTAL FAILED FILES", self.total_failures])
+        collective_data.append(["TOTAL UNCHANGED FILES (NOT WRITTEN)", len(self.skipped_files)])
+        if self.prefilter_scanned > 0:
+            hit_rate = 100 * self.prefilter_hits / self.prefilter_scanned
+            collective_data.append(["FILES WITH KEYS (PREFILTER HITS)", f"{self.prefilter_hits} / {self.prefilter_scanned} ({hit_rate:.1f}%)"])
+        if self.cache is not None:
+            collective_data.append(["FILES FROM CACHE", self.cache.hits])
+            collective_data.append(["FILES NOT IN CACHE", self.cache.misses])
+        # print("\nAGGREGATION:")
+        print()
+        print(tabulate(collective_data, headers=["Aggregation", "Count"]))
+        print()
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--sheet', dest='sheets', nargs=3, action='append', default=[],
+                        metavar=('REPL_FILE', 'KEY', 'REPL'),
+                        help='''A repl sheet to localize with: csv file, column to build keys to replace from
+                        and column to build values to replace to. Can be given several times, sheets are
+                        applied in the given order.''')
+
+    parser.add_argument('--key', type=str, required=False, default=None,
+                        help="columns to build keys to replace from (single sheet, use with --repl_file)")
+
+    parser.add_argument('--repl', type=str, required=False, default=None,
+                        help="columns to build values to replace to (single sheet, use with --repl_file)")
+
+    parser.add_argument('--repl_file', type=str, required=False, default=None,
+                        help="csv file with replacement information (single sheet)")
+
+    parser.add_argument('--dir', type=str, required=False, default='.',
+                        help='''This is the directory that the localizer with walk through to make
+                        The translations.''')
+
+    parser.add_argument('--include', type=str, action='append', default=None, metavar='PATTERN',
+                        help='''Glob pattern of the files to localize in --dir, e.g. "*.html". Can be given
+                        more than once. Defaults to *.ts and *.tsx.''')
+
+    parser.add_argument('--file', type=str, required=False, default=None,
+                        help='''This is the file that the localizer will work with. This overrides --dir.''')
+
+    parser.add_argument('--verbose', '-v', default=False, action='store_true',
+                        help="Set verbose to print checkopints.")
+
+    parser.add_argument('--very_verbose', '-vv', default=False, action='store_true',
+                        help="Set very verbose to print more checkpoints.")
+
+    parser.add_argument('--jobs', '-j', type=int, required=False, default=1,
+                        help="Number of worker processes to localize files with.")
+
+    parser.add_argument('--cache_dir', type=str, required=False, default=None,
+                        help='''Directory of the localization cache (e.g. .localize-cache). Files whose content
+                        and repl sheets did not change since a cached run get the cached output without
+                        being localized again. Delete the directory to clear it.''')
+
+    parser.add_argument('--changed_since', type=str, action='append', default=[], metavar='OLD_REPL_FILE',
+                        help='''An older version of one of the repl sheets (matched to --sheet by text, emoji or
+                        values in the file name). Only files that contain keys changed since then are localized
+                        again, the rest get their cached output. Requires --cache_dir and a previous cached run.''')
+
+    parser.add_argument('--no_prefilter', default=False, action='store_true',
+                        help='''Localize every file. By default the raw bytes of each file are searched for the repl
+                        keys first, and files without any key are skipped.''')
+
+    parser.add_argument('--stream', default=False, action='store_true',
+                        help='''Localize files in chunks instead of reading them whole, writing through a temp file
+                        that is atomically renamed over the original. Files without replacements are not rewritten.''')
+
+    parser.add_argument('--mmap', default=False, action='store_true',
+                        help='''Scan memory-mapped files with UTF-8 encoded keys and write the output from slices of
+                        the map, without decoding the files. Line endings of localized files are kept as they are.
+                        Only used when the sheets can be applied in a single pass.''')
+
+    parser.add_argument('--non_cascading', default=False, action='store_true',
+                        help='''Replace every key in a single pass. Replacements are not searched again for
+                        other keys, unlike the default ordered behaviour.''')
+
+    parser.add_argument('--literals_only', default=False, action='store_true',
+                        help='''Only replace keys inside string literals, template literal text and JSX text,
+                        not in identifiers, imports or comments. Files are lexed as TypeScript (and TSX for .tsx files).''')
+
+    parser.add_argument('--artifact', type=str, required=False, default=None,
+                        help='''Compiled repl artifact (see repl_artifact.py). It is used instead of the sheets
+                        when it was compiled from the same sheets and is newer than them.''')
+
+    args = parser.parse_args(argv)
+
+    if args.repl_file is not None:
+        if args.key is None or args.repl is None:
+            parser.error("--repl_file requires --key and --repl")
+        args.sheets.append([args.repl_file, args.key, args.repl])
+
+    if not args.sheets:
+        parser.error("at least one --sheet (or --repl_file, --key and --repl) is required")
+
+    if args.stream and args.cache_dir is not None:
+        parser.error("--stream can not be used with --cache_dir")
+
+    if args.mmap and (args.stream or args.cache_dir is not None):
+        parser.error("--mmap can not be used with --stream or --cache_dir")
+
+    if args.changed_since and args.cache_dir is None:
+        parser.error("--changed_since requires --cache_dir")
+
+    if args.literals_only and (args.stream or args.mmap or args.changed_since):
+        parser.error("--literals_only can not be used with --stream, --mmap or --changed_since")
+
+    if args.include is None:
+        args.include = ["*.ts", "*.tsx"]
+
+    if args.literals_only and any(not pattern.endswith((".ts", ".tsx")) for pattern in args.include):
+        parser.error("--literals_only only works on TypeScript files (*.ts and *.tsx)")
+
+    if args.very_verbose:
+        args.verbose = True
+
+    if args.verbose:
+        print(args)
+
+    return args
+
+def check_repl(label):
+    results = read_sheet(f"{label}_scorecard.csv")["Result"]
+    if "FAIL" in results:
+        message_log = colored(f"\n[FAIL] Skipping {label} sheet without localization.\n".upper(), 'red')
+        print(message_log)
+        return False
+
+    else:
+        message_log = colored(f"\n[PASS] Running localization for {label} sheet\n".upper(), 'green')
+        print(message_log)
+        return True
+
+def main():
+
+    args = get_args()
+
+    args.sheets = [sheet for sheet in args.sheets if check_repl(sheet_label(sheet[0]))]
+    if not args.sheets:
+        exit(1)
+
+    repl_files = ", ".join(repl_file for repl_file, _, _ in args.sheets)
+
+    if args.file is None:
+        print(f"Replacing Text from all {', '.join(args.include)} files in the directory {args.dir} using {repl_files}.")
+
+    else:
+        print(f"Replacing Text from {args.file} using {repl_files}.")
+
+    localizer = Localizer(args)
+    localizer.replace_text_all()
+    localizer.show_report()
+
+if __name__ == "__main__":
+    main()
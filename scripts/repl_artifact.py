@@ -0,0 +1,238 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+from array import array
+from itertools import islice
+
+from repl_matcher import ReplMatcher
+from repl_sheet import read_sheet
+
+MAGIC = b"REPLART\0"
+ARTIFACT_VERSION = 1
+
+# magic, version, payload length, sha256 of the payload
+HEADER = struct.Struct("<8sIQ32s")
+META_LENGTH = struct.Struct("<Q")
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def encode_table(strings, out):
+    '''
+    Appends a string table to the bytearray out and returns its description for the metadata.
+
+    A table is the character offsets of the strings (int64), a null flag per string and the
+    UTF-8 encoded concatenation of the strings, so it is decoded once and sliced.
+    '''
+    offsets = array('q', [0])
+    nulls = bytearray(len(strings))
+    text = []
+    for i, string in enumerate(strings):
+        if string is None:
+            nulls[i] = 1
+        else:
+            text.append(string)
+        offsets.append(offsets[-1] + (0 if string is None else len(string)))
+    blob = "".join(text).encode()
+
+    table = {"count": len(strings)}
+    for name, data in [("offsets", offsets.tobytes()), ("nulls", bytes(nulls)), ("blob", blob)]:
+        table[name] = [len(out), len(data)]
+        out += data
+    return table
+
+
+def decode_table(buffer, table):
+    def part(name):
+        start, length = table[name]
+        return buffer[start:start + length]
+
+    offsets = array('q')
+    offsets.frombytes(part("offsets"))
+    nulls = part("nulls")
+    text = str(part("blob"), "utf-8")
+
+    return [None if nulls[i] else text[offsets[i]:offsets[i + 1]] for i in range(table["count"])]
+
+
+def sheet_spec(repl_file, key, repl):
+    return {"repl_file": os.path.abspath(repl_file), "key": key, "repl": repl}
+
+
+def compile_artifact(path, sheets, labels, cascading=True):
+    '''
+    Compiles the (repl_file, key, repl) sheets into a binary artifact at path.
+
+    It holds every column of every sheet, the entries of the combined matcher and the state
+    derived from them (sorted keys, regex source, cascade analysis and fingerprint), with a
+    checksum of it all. Returns the matcher, or None if the sheets can not be localized with
+    (e.g. missing translations), in which case only the columns are saved, for ReplChecker.
+    '''
+    from file_utils import write_atomic
+
+    payload = bytearray()
+    meta_sheets = []
+    entries = []
+    for (repl_file, key, repl), label in zip(sheets, labels):
+        sheet = read_sheet(repl_file)
+        columns = {name: encode_table(sheet[name], payload) for name in sheet.columns}
+        # the last value for a key wins within a sheet, as in Localizer.build_repl_dict
+        repl_dict = {k: v for k, v in zip(sheet[key], sheet[repl])}
+        entries.extend((k, v, label) for k, v in repl_dict.items())
+        meta_sheets.append(dict(sheet_spec(repl_file, key, repl), label=label, rows=len(sheet),
+                                entries=len(repl_dict), columns=columns))
+
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "cascading": cascading,
+        "sheets": meta_sheets,
+        "entries": None,
+        "matcher": None,
+    }
+
+    try:
+        matcher = ReplMatcher(entries, cascading=cascading)
+    except ValueError as e:
+        print(f"{e}. Only the sheet columns are compiled.")
+        matcher = None
+
+    if matcher is not None:
+        state = matcher.compiled_state()
+        meta["entries"] = {
+            "keys": encode_table([k for k, _, _ in entries], payload),
+            "replacements": encode_table([v for _, v, _ in entries], payload),
+        }
+        meta["matcher"] = {
+            "keys": encode_table(state["keys"], payload),
+            "pattern": state["pattern"],
+            "cascade_free": state["cascade_free"],
+            "fingerprint": state["fingerprint"],
+        }
+
+    meta_bytes = json.dumps(meta).encode()
+    payload = META_LENGTH.pack(len(meta_bytes)) + meta_bytes + payload
+    header = HEADER.pack(MAGIC, ARTIFACT_VERSION, len(payload), hashlib.sha256(payload).digest())
+    write_atomic(path, header + payload)
+
+    return matcher
+
+
+class ReplArtifact:
+    '''
+    A compiled repl artifact, memory-mapped.
+
+    The checksum is verified on open, the string tables are only decoded when asked for.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.getsize(path) < HEADER.size:
+            raise ArtifactError(f"{path} is not a repl artifact.")
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, length, checksum = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise ArtifactError(f"{path} is not a repl artifact.")
+        if version != ARTIFACT_VERSION:
+            raise ArtifactError(f"{path} has version {version}, expected {ARTIFACT_VERSION}. Compile it again.")
+
+        payload = memoryview(self.mmap)[HEADER.size:HEADER.size + length]
+        if len(payload) != length or hashlib.sha256(payload).digest() != checksum:
+            raise ArtifactError(f"{path} is corrupt, checksum mismatch. Compile it again.")
+
+        meta_length, = META_LENGTH.unpack_from(payload)
+        self.meta = json.loads(str(payload[META_LENGTH.size:META_LENGTH.size + meta_length], "utf-8"))
+        self.tables = payload[META_LENGTH.size + meta_length:]
+
+    def matches(self, sheets, cascading=None):
+        '''
+        True if the artifact has a matcher compiled from these sheets and is newer than all of them.
+        '''
+        if self.meta["matcher"] is None:
+            return False
+        if [sheet_spec(*sheet) for sheet in sheets] != [{name: sheet[name] for name in ["repl_file", "key", "repl"]}
+                                                       for sheet in self.meta["sheets"]]:
+            return False
+        if cascading is not None and cascading != self.meta["cascading"]:
+            return False
+
+        artifact_mtime = os.path.getmtime(self.path)
+        return all(os.path.getmtime(repl_file) <= artifact_mtime for repl_file, _, _ in sheets)
+
+    def find_sheet(self, repl_file):
+        for sheet in self.meta["sheets"]:
+            if sheet["repl_file"] == os.path.abspath(repl_file):
+                if os.path.getmtime(repl_file) > os.path.getmtime(self.path):
+                    return None
+                return sheet
+        return None
+
+    def columns(self, sheet):
+        return {name: decode_table(self.tables, table) for name, table in sheet["columns"].items()}
+
+    def repl_dicts(self):
+        '''
+        The repl dictionary of every sheet, in order.
+        '''
+        keys, replacements = [decode_table(self.tables, self.meta["entries"][name]) for name in ["keys", "replacements"]]
+        entries = zip(keys, replacements)
+        return [dict(islice(entries, sheet["entries"])) for sheet in self.meta["sheets"]]
+
+    def compiled_state(self):
+        '''
+        The matcher state to pass to ReplMatcher as compiled.
+        '''
+        return dict(self.meta["matcher"], keys=decode_table(self.tables, self.meta["matcher"]["keys"]))
+
+
+def load_artifact(path, verbose=False):
+    '''
+    Opens the artifact at path, or returns None (with a note) if it is missing or unusable.
+    '''
+    if path is None or not os.path.exists(path):
+        if verbose and path is not None:
+            print(f"No repl artifact at {path}, reading the sheets.")
+        return None
+
+    try:
+        return ReplArtifact(path)
+    except ArtifactError as e:
+        print(f"{e} Reading the sheets.")
+        return None
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--sheet', type=str, nargs=3, action='append', required=True,
+                        metavar=('REPL_FILE', 'KEY', 'REPL'),
+                        help='''A repl sheet to compile, as the csv file, the key column and the replacement column.
+                        Can be given more than once, in the order the Localizer uses them.''')
+
+    parser.add_argument('--output', '-o', type=str, required=True,
+                        help="path of the compiled artifact")
+
+    parser.add_argument('--non_cascading', action='store_true',
+                        help="compile for a Localizer run with --non_cascading")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+
+    from localizer import sheet_label
+
+    args = get_args()
+
+    sheets = [tuple(sheet) for sheet in args.sheet]
+    matcher = compile_artifact(args.output, sheets, [sheet_label(repl_file) for repl_file, _, _ in sheets],
+                               cascading=not args.non_cascading)
+
+    keys = f"{len(matcher.repl_dict)} repl keys" if matcher is not None else "the columns"
+    print(f"Compiled {keys} of {len(sheets)} sheets into {args.output} ({os.path.getsize(args.output)} bytes).")
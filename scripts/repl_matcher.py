@@ -0,0 +1,304 @@
+import re
+import json
+import hashlib
+
+
+def split_lines(text):
+    '''
+    Splits text on "\\n" only, keeping the line endings (same as readlines() in text mode).
+    '''
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+class ReplMatcher:
+    '''
+    Compiled matcher for one or more repl sheets.
+
+    entries is an ordered list of (key, replacement, label) tuples, where label names the
+    sheet the row came from so that counts can be reported per sheet.
+
+    All keys are joined into one alternation regex (longest key first) so a whole file
+    is scanned once, instead of once per key.
+
+    cascading=True gives the same result as applying the entries one after another in
+    order (the old behaviour of replace_*_in_string, sheet after sheet). When the entries
+    are cascade free (no key can be produced or hidden by another replacement) this is
+    done in a single pass, otherwise only the lines that contain a key go through the
+    ordered loop.
+
+    cascading=False always uses the single pass, so every span of the source is
+    replaced at most once.
+
+    compiled is the state returned by compiled_state() for the same entries, as saved in
+    a compiled repl artifact, so it does not have to be derived again.
+    '''
+
+    def __init__(self, entries, cascading=True, compiled=None):
+        for key, replacement, label in entries:
+            if type(key) != str or key == "":
+                raise ValueError(f"Invalid repl key in {label}: {key!r}")
+            if type(replacement) != str:
+                raise ValueError(f"Invalid replacement in {label} for key {key!r}: {replacement!r}")
+
+        self.entries = entries
+        self.cascading = cascading
+        self.labels = list(dict.fromkeys(label for _, _, label in entries))
+
+        # the first entry for a key wins, as it does in the ordered loop.
+        self.repl_dict = {}
+        self.label_of = {}
+        for key, replacement, label in entries:
+            if key not in self.repl_dict:
+                self.repl_dict[key] = replacement
+                self.label_of[key] = label
+
+        if compiled is None:
+            self.keys = sorted(self.repl_dict.keys(), key=len, reverse=True)
+        else:
+            self.keys = compiled["keys"]
+        self.max_key_len = len(self.keys[0]) if self.keys else 0
+
+        if compiled is not None and compiled["pattern"] is not None:
+            self.pattern = re.compile(compiled["pattern"])
+        elif self.keys:
+            self.pattern = re.compile("|".join(re.escape(key) for key in self.keys))
+        else:
+            self.pattern = None
+
+        # the same alternation over the UTF-8 encoded keys, to search raw file contents.
+        # Files are read with universal newlines, so keys with line breaks can not be searched this way.
+        if self.keys and not any("\n" in key or "\r" in key for key in self.keys):
+            self.byte_pattern = re.compile(b"|".join(re.escape(key.encode()) for key in self.keys))
+            self.byte_repl_dict = {key.encode(): (val.encode(), self.label_of[key]) for key, val in self.repl_dict.items()}
+        else:
+            self.byte_pattern = None
+            self.byte_repl_dict = None
+
+        if compiled is None:
+            self.cascade_free = self.is_cascade_free()
+            # identifies the entries and mode, so localized output can be cached against it.
+            self.fingerprint = hashlib.sha256(json.dumps([entries, cascading]).encode()).hexdigest()
+        else:
+            self.cascade_free = compiled["cascade_free"]
+            self.fingerprint = compiled["fingerprint"]
+
+    @classmethod
+    def from_dict(cls, repl_dict, label=None, cascading=True):
+        return cls([(key, replacement, label) for key, replacement in repl_dict.items()], cascading=cascading)
+
+    def compiled_state(self):
+        '''
+        The derived state that can be passed back as compiled, to skip sorting, escaping and
+        the cascade analysis the next time the same entries are loaded.
+        '''
+        return {
+            "keys": self.keys,
+            "pattern": self.pattern.pattern if self.pattern is not None else None,
+            "cascade_free": self.cascade_free,
+            "fingerprint": self.fingerprint,
+        }
+
+    def is_cascade_free(self):
+        '''
+        True if applying the keys one by one in dict order can not give a different
+        result than a single leftmost-longest pass.
+        '''
+        if self.pattern is None:
+            return True
+
+        replacements = list(self.repl_dict.values())
+
+        if "" in replacements:
+            return False
+
+        for key in self.keys:
+            # keys are matched per line by the ordered loop.
+            if "\n" in key:
+                return False
+            # another key inside this key
+            if self.pattern.search(key, 1) or self.pattern.search(key[:-1]):
+                return False
+
+        for replacement in replacements:
+            if self.pattern.search(replacement):
+                return False
+
+        repl_pattern = re.compile("|".join(re.escape(r) for r in sorted(set(replacements), key=len, reverse=True)))
+        for key in self.keys:
+            if repl_pattern.search(key):
+                return False
+
+        # a key that starts at the end of a replacement or of another key,
+        # or that ends at the start of a replacement
+        prefixes = {}
+        for key in self.keys:
+            for i in range(1, len(key)):
+                prefixes.setdefault(key[:i], set()).add(key)
+
+        for replacement in replacements:
+            for i in range(max(1, len(replacement) - self.max_key_len + 1), len(replacement)):
+                if replacement[i:] in prefixes:
+                    return False
+
+        repl_prefixes = set()
+        for replacement in replacements:
+            for i in range(1, min(len(replacement), self.max_key_len) + 1):
+                repl_prefixes.add(replacement[:i])
+
+        for key in self.keys:
+            for i in range(1, len(key)):
+                if key[i:] in repl_prefixes:
+                    return False
+                if prefixes.get(key[i:], {key}) != {key}:
+                    return False
+
+        return True
+
+    def replace_ordered(self, line, counts):
+        '''
+        Applies the entries one after another in order, adding the counts per label.
+        '''
+        for key, replacement, label in self.entries:
+            count = line.count(key)
+            if count:
+                counts[label] += count
+                line = line.replace(key, replacement)
+
+        return line
+
+    def replace_counted(self, text, occurrences=None):
+        '''
+        Replaces occurances of the keys in text. Returns the new text and the replacement count per label.
+        If an occurrences dict is given, the (1-based) line numbers of every key found in text are added to it.
+        '''
+        counts = dict.fromkeys(self.labels, 0)
+
+        if self.pattern is None:
+            return text, counts
+
+        if not self.cascading or self.cascade_free:
+            cursor = [0, 1]
+
+            def repl(match):
+                key = match.group()
+                counts[self.label_of[key]] += 1
+                if occurrences is not None:
+                    cursor[1] += text.count("\n", cursor[0], match.start())
+                    cursor[0] = match.start()
+                    occurrences.setdefault(key, []).append(cursor[1])
+                return self.repl_dict[key]
+
+            return self.pattern.sub(repl, text), counts
+
+        if not self.pattern.search(text):
+            return text, counts
+
+        new_lines = []
+        for line_number, line in enumerate(split_lines(text), 1):
+            if self.pattern.search(line):
+                if occurrences is not None:
+                    for match in self.pattern.finditer(line):
+                        occurrences.setdefault(match.group(), []).append(line_number)
+                line = self.replace_ordered(line, counts)
+            new_lines.append(line)
+
+        return "".join(new_lines), counts
+
+    def search_stream(self, source, chunk_size):
+        '''
+        Whether any key occurs in the text read from source in chunks of chunk_size, carrying over
+        (longest key - 1) characters like replace_stream. Nothing is replaced if no key occurs,
+        with cascading or not, so a file this returns False for does not need to be rewritten.
+        '''
+        if self.pattern is None:
+            return False
+
+        carry = ""
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return False
+            text = carry + chunk
+            if self.pattern.search(text):
+                return True
+            carry = text[max(0, len(text) - self.max_key_len + 1):] if self.max_key_len > 1 else ""
+
+    def replace_stream(self, source, target, chunk_size):
+        '''
+        Reads text from source in chunks of chunk_size, writes the replaced text to target and
+        returns the replacement count per label.
+
+        The last (longest key - 1) characters of every chunk are carried over to the next one,
+        so keys split by a chunk boundary are still found. The ordered loop works per line,
+        so it streams the source line by line instead.
+        '''
+        counts = dict.fromkeys(self.labels, 0)
+
+        if self.pattern is not None and self.cascading and not self.cascade_free:
+            for line in source:
+                if self.pattern.search(line):
+                    line = self.replace_ordered(line, counts)
+                target.write(line)
+            return counts
+
+        carry = ""
+        while True:
+            chunk = source.read(chunk_size)
+            text = carry + chunk
+
+            # matches starting before safe can not be changed by the next chunk.
+            safe = len(text) if not chunk else len(text) - self.max_key_len + 1
+            pos = 0
+            if self.pattern is not None:
+                for match in self.pattern.finditer(text):
+                    if match.start() >= safe:
+                        break
+                    key = match.group()
+                    counts[self.label_of[key]] += 1
+                    target.write(text[pos:match.start()])
+                    target.write(self.repl_dict[key])
+                    pos = match.end()
+
+            end = max(pos, safe)
+            target.write(text[pos:end])
+            carry = text[end:]
+
+            if not chunk:
+                return counts
+
+    def replace_bytes(self, buffer):
+        '''
+        Single pass over a bytes-like buffer (e.g. an mmap) with the UTF-8 encoded keys.
+
+        Returns the output as a list of memoryview slices of buffer and replacement bytes,
+        so nothing but the replacements is copied, and the replacement count per label.
+        Only valid when a single pass gives the right result (see replace_counted).
+        '''
+        counts = dict.fromkeys(self.labels, 0)
+        view = memoryview(buffer)
+        parts = []
+        pos = 0
+
+        for match in self.byte_pattern.finditer(buffer):
+            replacement, label = self.byte_repl_dict[match.group()]
+            counts[label] += 1
+            parts.append(view[pos:match.start()])
+            parts.append(replacement)
+            pos = match.end()
+
+        parts.append(view[pos:])
+        view.release()
+
+        return parts, counts
+
+    def replace(self, text):
+        '''
+        Replaces occurances of the keys in text. Returns the new text and the replacement count.
+        '''
+        text, counts = self.replace_counted(text)
+        return text, sum(counts.values())
@@ -0,0 +1,55 @@
+import csv
+
+
+class Sheet:
+    '''
+    A repl sheet read with the csv module, as columns of python values.
+
+    Empty cells are None. Columns are str unless a type is given for them in read_sheet.
+    sheet[name] returns a column as a list, like df[name] does for the pandas loader.
+    '''
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+
+def read_sheet(file_name, types=None):
+    '''
+    Reads a csv sheet. types maps column names to a function to convert their non-empty cells with.
+    '''
+    types = types or {}
+
+    with open(file_name, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+
+        # repeated column names get a .1, .2, ... suffix, as pandas does.
+        names = []
+        for name in header:
+            unique_name, n = name, 0
+            while unique_name in names:
+                n += 1
+                unique_name = f"{name}.{n}"
+            names.append(unique_name)
+        columns = {name: [] for name in names}
+
+        for row in reader:
+            if not row:
+                continue
+            row += [""] * (len(names) - len(row))
+            for name, cell in zip(names, row):
+                if cell == "":
+                    columns[name].append(None)
+                else:
+                    columns[name].append(types[name](cell) if name in types else cell)
+
+    return Sheet(columns)
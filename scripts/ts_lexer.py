@@ -0,0 +1,204 @@
+import re
+
+# code is read a token at a time; only punctuation needs a closer look.
+TOKEN = re.compile(r"\s+|//[^\n]*|/\*.*?(?:\*/|\Z)|[\w$]+|.", re.S)
+
+STRING = {
+    '"': re.compile(r'"((?:[^"\\\n]|\\.)*)"?', re.S),
+    "'": re.compile(r"'((?:[^'\\\n]|\\.)*)'?", re.S),
+}
+TEMPLATE_TEXT = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.S)
+REGEX_LITERAL = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\]?)+/[\w$]*")
+
+JSX_NAME = re.compile(r"(?!\d)[\w$][\w$.:\-]*")
+JSX_ATTR_STRING = re.compile(r'"([^"]*)"|\'([^\']*)\'')
+JSX_TEXT = re.compile(r"[^<{]+")
+JSX_CLOSING = re.compile(r"</[^>]*>?")
+SPACE = re.compile(r"\s*")
+
+# after these words an expression starts, so / begins a regex and < a JSX element.
+EXPRESSION_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+                       "case", "do", "else", "yield", "await"}
+
+# strings after these are module specifiers, not text: from "...", import "...", declare module "..."
+MODULE_KEYWORDS = {"from", "import", "module"}
+# and import("...") or require("...")
+MODULE_FUNCTIONS = {"import", "require"}
+
+
+class TSLexer:
+    '''
+    Minimal TypeScript / TSX lexer that finds where text literals are.
+
+    It knows just enough of the language to tell strings, template literals, JSX text,
+    comments and regex literals apart from code. It does not build tokens or a tree, it
+    collects the (start, end) spans of string literal contents, template literal text
+    segments (not their ${...} expressions), JSX attribute strings and JSX text.
+    Module specifiers (import ... from "...", require("...")) are not text literals.
+    '''
+
+    def __init__(self, text, jsx=False):
+        self.text = text
+        self.jsx = jsx
+        self.spans = []
+
+    def lex(self):
+        self.code(0, closing=False)
+        return self.spans
+
+    def code(self, i, closing):
+        '''
+        Lexes code from i. With closing, stops after the } that closes the ${ or { it is in.
+        Returns the index it stopped at.
+        '''
+        text = self.text
+        depth = 0
+        expression = True
+        # the last two tokens, other than spaces and comments
+        previous = before_previous = None
+
+        while i < len(text):
+            token = TOKEN.match(text, i)
+            value = token.group()
+            end = token.end()
+
+            if value[0].isspace() or value.startswith(("//", "/*")):
+                i = end
+                continue
+
+            if value[0].isalnum() or value[0] in "_$" or len(value) > 1:
+                expression = value in EXPRESSION_KEYWORDS
+
+            elif value in STRING:
+                match = STRING[value].match(text, i)
+                if previous not in MODULE_KEYWORDS and not (previous == "(" and before_previous in MODULE_FUNCTIONS):
+                    self.spans.append(match.span(1))
+                end = match.end()
+                expression = False
+
+            elif value == "`":
+                end = self.template(i + 1)
+                expression = False
+
+            elif value == "/" and expression and REGEX_LITERAL.match(text, i):
+                end = REGEX_LITERAL.match(text, i).end()
+                expression = False
+
+            elif value == "<" and expression and self.jsx:
+                element_end = self.jsx_element(i)
+                if element_end is None:
+                    expression = True
+                else:
+                    end = element_end
+                    expression = False
+
+            elif value == "{":
+                depth += 1
+                expression = True
+
+            elif value == "}":
+                if depth == 0 and closing:
+                    return end
+                depth = max(depth - 1, 0)
+                expression = False
+
+            else:
+                expression = value not in ")]"
+
+            previous, before_previous = value, previous
+            i = end
+
+        return i
+
+    def template(self, i):
+        '''
+        Lexes a template literal from just after its opening backtick. Returns the index after it.
+        '''
+        text = self.text
+        while True:
+            match = TEMPLATE_TEXT.match(text, i)
+            if match.end() > i:
+                self.spans.append(match.span())
+            i = match.end()
+
+            if i >= len(text):
+                return i
+            if text[i] == "`":
+                return i + 1
+            # ${
+            i = self.code(i + 2, closing=True)
+
+    def jsx_element(self, i):
+        '''
+        Lexes a JSX element (or fragment) starting at its <. Returns the index after it, or None
+        if this is not an element after all (a comparison or type parameters), with no spans added.
+        '''
+        text = self.text
+        spans_before = len(self.spans)
+
+        i += 1
+        name = JSX_NAME.match(text, i)
+        if name is None and not text.startswith(">", i):
+            return None
+        if name is not None:
+            i = name.end()
+
+        # attributes
+        while True:
+            i = SPACE.match(text, i).end()
+
+            if text.startswith("/>", i):
+                return i + 2
+            if text.startswith(">", i):
+                i += 1
+                break
+            if text.startswith("{", i):
+                i = self.code(i + 1, closing=True)
+                continue
+
+            attribute = JSX_NAME.match(text, i)
+            if attribute is None:
+                del self.spans[spans_before:]
+                return None
+            i = SPACE.match(text, attribute.end()).end()
+
+            if not text.startswith("=", i):
+                continue
+            i = SPACE.match(text, i + 1).end()
+
+            value = JSX_ATTR_STRING.match(text, i)
+            if value is not None:
+                self.spans.append(value.span(1) if value.group(1) is not None else value.span(2))
+                i = value.end()
+            elif text.startswith("{", i):
+                i = self.code(i + 1, closing=True)
+            else:
+                del self.spans[spans_before:]
+                return None
+
+        # children
+        while i < len(text):
+            if text.startswith("</", i):
+                return JSX_CLOSING.match(text, i).end()
+            if text[i] == "{":
+                i = self.code(i + 1, closing=True)
+                continue
+            if text[i] == "<":
+                child_end = self.jsx_element(i)
+                if child_end is not None:
+                    i = child_end
+                    continue
+            child_text = JSX_TEXT.match(text, i + (text[i] == "<"))
+            end = child_text.end() if child_text is not None else i + 1
+            self.spans.append((i, end))
+            i = end
+
+        return i
+
+
+def literal_spans(text, jsx=False):
+    '''
+    (start, end) spans of the text literals in TypeScript source, in order.
+    jsx=True also lexes JSX elements, for .tsx files.
+    '''
+    return TSLexer(text, jsx).lex()
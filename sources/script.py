@@ -1,19 +1,33 @@
+import io
 import json
 import re
 import pymongo
 import os
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import utils
 import argparse
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from tabulate import tabulate
 
 CONFIG_JSON = "./localizeconfig.json"
 MODEL_DIR = "models"
+LEDGER_JSON = "./regex_approvals.json"
 
 config = None
 client = None
 db = None
+ledger = None
+events = None
 
 
-def init():
+def init(mongo_uri=None):
     
     global client
     global db
@@ -23,25 +37,148 @@ def init():
     with open(CONFIG_JSON, 'r') as f:
         config = json.load(f)
     
-    assert "apiEnvVars" in config, "'apiEnvVars' object missing from config file"
-    assert "MONGODB_URI" in config['apiEnvVars'], "'MONGODB_URI' object missing from apiEnvVars in config"
-    
-    
-    mongo_uri = config['apiEnvVars']['MONGODB_URI']
+    if mongo_uri is None:
+        assert "apiEnvVars" in config, "'apiEnvVars' object missing from config file"
+        assert "MONGODB_URI" in config['apiEnvVars'], "'MONGODB_URI' object missing from apiEnvVars in config"
+        mongo_uri = config['apiEnvVars']['MONGODB_URI']
     
     client = pymongo.MongoClient(mongo_uri)
     db = client['test']
 
 
+class JsonLinesSink:
+    '''
+    Writes every event as a line of json to file_name.
+    '''
+
+    def __init__(self, file_name):
+        self.f = open(file_name, "a")
+        self.lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self.lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class MemorySink:
+    '''
+    Keeps the events in a list, and shows which steps and sources took the longest.
+    '''
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def emit(self, event):
+        with self.lock:
+            self.events.append(event)
+
+    def close(self):
+        pass
+
+    def show_summary(self, n=5):
+        if not self.events:
+            return
+
+        steps = {}
+        sources = {}
+        for event in self.events:
+            steps.setdefault(event['step'], []).append(event)
+            if event['source'] is not None:
+                sources.setdefault(event['source'], []).append(event)
+
+        rows = []
+        for step, step_events in steps.items():
+            durations = [event['duration'] for event in step_events]
+            failed = sum(event['outcome'] == "failed" for event in step_events)
+            rows.append([step, len(durations), failed, sum(durations), sum(durations) / len(durations), max(durations)])
+        rows.sort(key=lambda row: -row[3])
+        print("\nSLOWEST STEPS:\n")
+        print(tabulate(rows[:n], headers=["Step", "Runs", "Failed", "Total (s)", "Mean (s)", "Max (s)"], floatfmt=".3f"))
+
+        rows = []
+        for source, source_events in sources.items():
+            slowest = max(source_events, key=lambda event: event['duration'])
+            outcome = "failed" if any(event['outcome'] == "failed" for event in source_events) else "passed"
+            rows.append([source, outcome, sum(event['duration'] for event in source_events), slowest['step']])
+        rows.sort(key=lambda row: -row[2])
+        print("\nSLOWEST SOURCES:\n")
+        print(tabulate(rows[:n], headers=["Source", "Outcome", "Total (s)", "Slowest step"], floatfmt=".3f"))
+        print()
+
+
+class EventLog:
+    '''
+    Sends an event for every step that runs to each of its sinks. A sink is anything with
+    emit(event) and close(), e.g. JsonLinesSink or MemorySink.
+
+    An event is a dict with the step name, the source identifier (None for steps that are not
+    about one source), when it started, its duration in seconds, its outcome ("passed" or
+    "failed") and, if it failed, the type and message of the exception.
+    '''
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def step_name(g):
+    # pipeline steps are static methods, which are wrapped before the staticmethod is applied
+    return getattr(g, '__func__', g).__qualname__
+
+
+def timed_step(g):
+    '''
+    Sends an event to events for every call of g (see EventLog).
+    '''
+    name = step_name(g)
+
+    def wrapper(*args, **kwargs):
+        source = args[0] if args else None
+        event = {
+            'step': name,
+            'source': source.get('identifier') if isinstance(source, dict) else None,
+            'start': time.time(),
+        }
+        start = time.perf_counter()
+        try:
+            result = g(*args, **kwargs)
+            event['outcome'] = "passed"
+            return result
+        except Exception as e:
+            event['outcome'] = "failed"
+            event['error'] = type(e).__name__
+            event['message'] = str(e)
+            raise
+        finally:
+            event['duration'] = time.perf_counter() - start
+            if events is not None:
+                events.emit(event)
+    return wrapper
+
+
 def pipeline_step(positive_msg, negative_msg):
     def f(g):
+        timed = timed_step(g)
         def wrapper(*args, **kwargs):
             try:
-                g(*args, **kwargs)
+                timed(*args, **kwargs)
                 print(f"✅ {positive_msg}")
             except Exception as e:
                 print(f"❌ {negative_msg}. Error received: '{e}'")
-                raise Exception("Go to next one")
+                raise Exception("Go to next one") from e
         return wrapper
     return f
 
@@ -49,8 +186,67 @@ def display_name_to_scraper_name(display_name):
     return display_name.lower().capitalize() + "Scraper"
 
 
+class ApprovalLedger:
+    '''
+    Regex matches that were approved before, kept in a json file, so they are not asked about
+    again while the identifier, domain, regex, example url and matched substring stay the same.
+
+    Approvals are pending per source until commit(), so a source that is rejected later
+    (see ConcurrentPipeline.confirm) does not keep them.
+    '''
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.approved = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        if os.path.exists(file_name):
+            with open(file_name, 'r') as f:
+                self.approved = json.load(f)['approved']
+
+    @staticmethod
+    def key(identifier, domain, regex, example_url, matched_substring):
+        entry = [identifier, domain, regex, example_url, matched_substring]
+        return hashlib.sha256(json.dumps(entry).encode()).hexdigest()
+
+    def is_approved(self, key):
+        return key in self.approved
+
+    def approve(self, identifier, key, entry):
+        with self.lock:
+            self.pending.setdefault(identifier, {})[key] = entry
+
+    def discard(self, identifiers):
+        with self.lock:
+            for identifier in identifiers:
+                self.pending.pop(identifier, None)
+
+    def commit(self):
+        '''
+        Adds the pending approvals to the ledger and saves it, through a temp file and a rename.
+        '''
+        with self.lock:
+            if not self.pending:
+                return
+            for approvals in self.pending.values():
+                self.approved.update(approvals)
+            self.pending = {}
+
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file_name)), prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({'approved': self.approved}, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_file, self.file_name)
+
+
 class UserPrompt:
 
+    # with interactive = False nothing is asked and every yes/no question is answered with no.
+    interactive = True
+
+    # a thread that sets deferred.questions gets its yes/no questions recorded
+    # in that list and answered with yes, to be confirmed all together later.
+    deferred = threading.local()
+
     @staticmethod
     def __format(prompt):
         return f"\t - {prompt}"
@@ -61,6 +257,17 @@ class UserPrompt:
 
     @staticmethod
     def yes_no(prompt):
+        # checked first, so deferred questions are not confirmed later either
+        if not UserPrompt.interactive:
+            UserPrompt.print(f"{prompt}[y/n] n (not asked, running non-interactively)")
+            return False
+
+        questions = getattr(UserPrompt.deferred, "questions", None)
+        if questions is not None:
+            questions.append(prompt)
+            UserPrompt.print(f"{prompt}[y/n] (confirmed at the end)")
+            return True
+
         inp = input(UserPrompt.__format(f"{prompt}[y/n] "))
         cleaned = inp.lower().strip()
         YES = 'y'
@@ -94,11 +301,28 @@ class Verifier:
             assert match is not None, f"No match found for regerx '{domain['regex']} in URL {domain['exampleUrl']}'"
 
             matched_substring = example_url[match.start():match.end()]
+
+            if ledger is not None:
+                key = ApprovalLedger.key(source['identifier'], domain['domain'], domain['regex'], example_url, matched_substring)
+                if ledger.is_approved(key):
+                    UserPrompt.print(f"We matched '{matched_substring}' in the string based on the regex, as approved before.")
+                    continue
+                assert UserPrompt.interactive, f"The match '{matched_substring}' for regex '{domain['regex']}' has not been approved. Run interactively to approve it"
+
             wants_to_continue = UserPrompt.yes_no(
                 f"We matched '{matched_substring}' in the string based on the regex. Is this correct?"
             )
             assert wants_to_continue, "We won't continue with this source since the regex match was incorrect"
 
+            if ledger is not None:
+                ledger.approve(source['identifier'], key, {
+                    'identifier': source['identifier'],
+                    'domain': domain['domain'],
+                    'regex': domain['regex'],
+                    'exampleUrl': example_url,
+                    'match': matched_substring,
+                })
+
     @pipeline_step("Name checks passed", "Name check not passed")
     @staticmethod
     def name(source):
@@ -109,20 +333,80 @@ class Verifier:
 
 class Upserter:
 
+    # In batch mode (see prefetch) the existing records, by identifier, and the
+    # (identifier, write) pairs that flush applies at the end.
+    existing = None
+    pending = []
+
+    @timed_step
+    @staticmethod
+    def prefetch(sources):
+        '''
+        Starts batch mode: fetches the records of all sources with one query, so database_record
+        compares locally and queues its writes for flush instead of making them one by one.
+        '''
+        identifiers = [source['identifier'] for source in sources if 'identifier' in source]
+        docs = db.articlesources.find({"identifier": {"$in": identifiers}})
+        Upserter.existing = {doc['identifier']: doc for doc in docs}
+        Upserter.pending = []
+
+    @staticmethod
+    def discard(identifiers):
+        '''
+        Drops the queued writes of these sources.
+        '''
+        Upserter.pending = [(identifier, op) for identifier, op in Upserter.pending if identifier not in identifiers]
+
+    @timed_step
+    @staticmethod
+    def flush():
+        '''
+        Applies the writes queued in batch mode with one bulk_write.
+        Returns the identifiers of the sources whose write failed.
+        '''
+        if not Upserter.pending:
+            return set()
+
+        identifiers = [identifier for identifier, _ in Upserter.pending]
+        ops = [op for _, op in Upserter.pending]
+        n_updates = sum(type(op) == UpdateOne for op in ops)
+        Upserter.pending = []
+
+        try:
+            result = db.articlesources.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {identifiers[error['index']] for error in e.details['writeErrors']}
+            for error in e.details['writeErrors']:
+                print(f"❌ Writing source '{identifiers[error['index']]}' failed. Error received: '{error['errmsg']}'")
+            return failed
+
+        print(f"✅ Wrote {result.inserted_count} new and {result.modified_count} updated article source records")
+        if result.modified_count != n_updates:
+            print(f"❗ {n_updates - result.modified_count} of the {n_updates} updates were not made, the records were not found or already up to date")
+        return set()
+
     @pipeline_step("Article source record is up to date in database", "Article source record is NOT up to date in database")
     @staticmethod
     def database_record(source):
         id = source['identifier']
         filter_query = {"identifier": id}
-        doc = db.articlesources.find_one(filter_query)
+        if Upserter.existing is not None:
+            doc = Upserter.existing.get(id)
+        else:
+            doc = db.articlesources.find_one(filter_query)
 
         keys = ["identifier", "displayName", "hostname", "logo"]
         if not doc:
             UserPrompt.print(
                 f"Source with identifier '{id}' does not exist. Writing it to database")
-            db.articlesources.insert_one({
-                key: source[key] for key in keys
-            })
+            record = {key: source[key] for key in keys}
+            if Upserter.existing is not None:
+                # later sources with the same identifier are compared against this one (when
+                # verifying concurrently, ConcurrentPipeline.run_all fails such sources instead)
+                Upserter.existing[id] = dict(record)
+                Upserter.pending.append((id, InsertOne(record)))
+            else:
+                db.articlesources.insert_one(record)
         else:
             diffs = [key for key in keys if doc[key] != source[key]]
 
@@ -147,6 +431,11 @@ class Upserter:
                 }
             }
 
+            if Upserter.existing is not None:
+                doc.update(update_query['$set'])
+                Upserter.pending.append((id, UpdateOne(filter_query, update_query)))
+                return
+
             # Update the document
             result = db.articlesources.update_one(filter_query, update_query)
 
@@ -195,23 +484,197 @@ class Pipeline:
             fn(*args, **kwargs)
 
 
+class ThreadOutput:
+    '''
+    Stands in for sys.stdout. A thread that set its own buffer writes there, other threads
+    write to the real stdout.
+    '''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ConcurrentPipeline(Pipeline):
+    '''
+    Runs the pipeline for many sources on a pool of threads.
+
+    The output of every source is buffered and printed in the order of the sources, and
+    yes/no questions are answered with yes while running and asked all together on one
+    confirmation screen at the end. So steps must not do anything that can not be taken
+    back before then (with Upserter.prefetch, database_record only queues its writes).
+    '''
+
+    def __init__(self, steps, jobs):
+        super().__init__(steps)
+        self.jobs = jobs
+
+    def run_source(self, i, n, source):
+        buffer = self.output.local.buffer = io.StringIO()
+        questions = UserPrompt.deferred.questions = []
+        try:
+            print(f"[{i + 1}/{n}] Reviewing source")
+            try:
+                self.run(source)
+                passed = True
+            except:
+                passed = False
+            return passed, buffer.getvalue(), questions
+        finally:
+            self.output.local.buffer = None
+            UserPrompt.deferred.questions = None
+
+    @staticmethod
+    def duplicates(sources):
+        '''
+        Indices of the sources whose identifier an earlier source already has.
+        '''
+        seen = set()
+        duplicates = set()
+        for i, source in enumerate(sources):
+            identifier = source.get('identifier') if isinstance(source, dict) else None
+            if identifier is None:
+                continue
+            if identifier in seen:
+                duplicates.add(i)
+            seen.add(identifier)
+        return duplicates
+
+    def run_all(self, sources):
+        '''
+        Returns the sources that passed every step and were confirmed.
+
+        A source with the identifier of an earlier one fails without running: in threads, the
+        two could both miss the record in Upserter.existing and both queue an insert.
+        '''
+        n = len(sources)
+        duplicates = self.duplicates(sources)
+        indices = [i for i in range(n) if i not in duplicates]
+
+        stdout = sys.stdout
+        sys.stdout = self.output = ThreadOutput(stdout)
+        try:
+            with ThreadPoolExecutor(self.jobs) as pool:
+                results = dict(zip(indices, pool.map(self.run_source, indices, [n] * len(indices), [sources[i] for i in indices])))
+        finally:
+            sys.stdout = stdout
+
+        for i in duplicates:
+            results[i] = (False, f"[{i + 1}/{n}] Reviewing source\n❌ The identifier '{sources[i]['identifier']}' "
+                                 f"is used by an earlier source, so this one is not verified\n", [])
+        results = [results[i] for i in range(n)]
+
+        for _, output, _ in results:
+            print(output, end="")
+
+        passed = [(i, source, questions) for i, (source, (ok, _, questions)) in enumerate(zip(sources, results)) if ok]
+        if not UserPrompt.interactive:
+            return [source for _, source, _ in passed]
+        rejected = self.confirm([(i, source, questions) for i, source, questions in passed if questions])
+        return [source for i, source, _ in passed if i not in rejected]
+
+    @staticmethod
+    def confirm(asked):
+        '''
+        Shows every question of every source at once and asks which sources to reject.
+        Returns the indices of the rejected sources.
+        '''
+        if not asked:
+            return set()
+
+        print("\nCONFIRMATION\n")
+        for i, source, questions in asked:
+            print(f"[{i + 1}] {source['identifier']}")
+            for question in questions:
+                UserPrompt.print(question)
+
+        numbers = [str(i + 1) for i, _, _ in asked]
+        while True:
+            inp = input("\nNumbers of the sources to reject, separated by spaces (empty to confirm all): ")
+            rejected = inp.replace(",", " ").split()
+            if all(number in numbers for number in rejected):
+                return {int(number) - 1 for number in rejected}
+            print(f"Please enter numbers among {', '.join(numbers)}")
+
+
+class CodeGenSession:
+    '''
+    The files CodeGen edits, each read once and edited in memory.
+    Nothing is written until flush(), so a failing step leaves every file as it was.
+    '''
+
+    def __init__(self):
+        self.contents = {}
+        self.changed = []
+
+    def read(self, file_name):
+        if file_name not in self.contents:
+            with open(file_name, 'r') as file:
+                self.contents[file_name] = file.read()
+        return self.contents[file_name]
+
+    def write(self, file_name, content):
+        self.contents[file_name] = content
+        if file_name not in self.changed:
+            self.changed.append(file_name)
+
+    @timed_step
+    def flush(self):
+        '''
+        Writes every changed file once. All of them are first written to temp files next to
+        them, and only renamed over the originals when all writes succeeded.
+        '''
+        tmp_files = []
+        try:
+            for file_name in self.changed:
+                fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(file_name) or ".", prefix=".tmp-")
+                tmp_files.append(tmp_file)
+                with os.fdopen(fd, "w") as file:
+                    file.write(self.contents[file_name])
+                    file.flush()
+                    os.fsync(file.fileno())
+                shutil.copymode(file_name, tmp_file)
+        except:
+            for tmp_file in tmp_files:
+                os.remove(tmp_file)
+            raise
+
+        for file_name, tmp_file in zip(self.changed, tmp_files):
+            os.replace(tmp_file, file_name)
+
+        written = len(self.changed)
+        self.changed = []
+        return written
+
+
 class CodeGen:
 
+    # while set, edits go to this session instead of straight to the files
+    session = None
+
     @staticmethod
     def replace_var(file_name, var_name, start_of, end_of, replacement):
-        # Read the file content
-        with open(file_name, 'r') as file:
-            content = file.read()
+        session = CodeGen.session or CodeGenSession()
+        content = session.read(file_name)
 
         # Find the start and end positions of the mapHostToArticleSourceIdentifier object
         start = content.find(start_of, content.index(var_name)) + len(start_of)
         end   = content.find(end_of, start)
 
-        with open(file_name, "w") as file:
-            file.write(content[:start] + replacement + content[end:])
+        session.write(file_name, content[:start] + replacement + content[end:])
+        if CodeGen.session is None:
+            session.flush()
         UserPrompt.print(f"UPDATED {var_name}")
             
 
+    @timed_step
     @staticmethod
     def handle_map_host_to_article_source_identifier(codegen_recipes):
         file_name = os.path.join(MODEL_DIR, "ArticleSources/utils.ts")
@@ -224,6 +687,7 @@ class CodeGen:
             replacement
         )
 
+    @timed_step
     @staticmethod
     def handle_map_article_source_identifier_to_regex(codegen_recipes):
         file_name = os.path.join(MODEL_DIR, "ArticleSources/utils.ts")
@@ -240,6 +704,7 @@ class CodeGen:
         )
 
 
+    @timed_step
     @staticmethod
     def handle_article_source_identifier(codegen_recipes):
         identifiers = set([_['identifier'] for _ in codegen_recipes])
@@ -253,6 +718,7 @@ class CodeGen:
             replacement
         )
 
+    @timed_step
     @staticmethod
     def handle_article_hostnames(codegen_recipes):
         replacement = "\n" + "\n".join(["\t| " + f"\"{_['domain']}\"" for _ in  codegen_recipes])
@@ -265,6 +731,7 @@ class CodeGen:
             replacement
         )
         
+    @timed_step
     @staticmethod
     def handle_scaper_factory(codegen_recipes):
         tuples = set(
@@ -309,9 +776,47 @@ class CodeGen:
                 
 
 
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--batch', default=False, action='store_true',
+                        help="""Fetch the records of all sources with one query and write the approved changes
+                        with one bulk write at the end, instead of a few round trips per source.""")
+
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="""Verify this many sources at a time. Questions are then asked together at the
+                        end, and --batch is used.""")
+
+    parser.add_argument('--ledger', type=str, default=LEDGER_JSON,
+                        help="json file of approved regex matches, which are not asked about again")
+
+    parser.add_argument('--non_interactive', default=False, action='store_true',
+                        help="""Never ask. Regex matches that are not in the ledger fail their source, other
+                        questions are answered with no, and the script exits with 1 if any source failed.""")
+
+    parser.add_argument('--events', type=str, default=None,
+                        help="append an event for every step (name, source, duration, outcome) to this json lines file")
+
+    parser.add_argument('--slowest', type=int, default=5,
+                        help="how many of the slowest steps and sources to show at the end (0 to show none)")
+
+    parser.add_argument('--mongo_uri', type=str, default=None,
+                        help="MongoDB to use instead of apiEnvVars.MONGODB_URI in the config, e.g. a local mongod")
+
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
 
-    init()
+    args = get_args()
+
+    init(args.mongo_uri)
+
+    timings = MemorySink()
+    events = EventLog([timings] + ([JsonLinesSink(args.events)] if args.events is not None else []))
+
+    ledger = ApprovalLedger(args.ledger)
+    UserPrompt.interactive = not args.non_interactive
 
     f = open(CONFIG_JSON, "r")
     config = json.load(f)
@@ -322,6 +827,13 @@ if __name__ == "__main__":
     sources = config['sources']
     codegen_recipes = []
     
+    if args.jobs > 1 and not args.batch:
+        print("Using --batch to verify sources concurrently.")
+        args.batch = True
+    
+    if args.batch:
+        Upserter.prefetch(sources)
+    
     verification_pipeline = Pipeline([
         Verifier.source_format,
         Verifier.regex_and_domains,
@@ -338,26 +850,69 @@ if __name__ == "__main__":
         CodeGen.handle_scaper_factory
     ])
     
-    for i, source in enumerate(sources):
-        print(f"[{i + 1}/{len(sources)}] Reviewing source")
-        try:
-            verification_pipeline.run(source)
-            # if source passes all checks then we perform codegen tasks
-            for domain_obj in source['domains']:
-                codegen_recipes.append({
-                    'display_name': source['displayName'],
-                    'domain': domain_obj['domain'],
-                    'identifier': source['identifier'],
-                    'regex': domain_obj['regex']
-                })
-        except:
-            pass
+    # in batch mode the records are written by Upserter.flush after verification, and scraper
+    # code is only written for the sources whose record was written (and that were confirmed).
+    verified_sources = []
+    if args.batch:
+        verification_pipeline = Pipeline(verification_pipeline.steps[:-1])
+    
+    if args.jobs > 1:
+        concurrent_pipeline = ConcurrentPipeline(verification_pipeline.steps, args.jobs)
+        verified_sources = concurrent_pipeline.run_all(sources)
+        confirmed_ids = set(source['identifier'] for source in verified_sources)
+        rejected_ids = set(source['identifier'] for source in sources if 'identifier' in source) - confirmed_ids
+        Upserter.discard(rejected_ids)
+        ledger.discard(rejected_ids)
+        ledger.commit()
+    else:
+        for i, source in enumerate(sources):
+            print(f"[{i + 1}/{len(sources)}] Reviewing source")
+            try:
+                verification_pipeline.run(source)
+                verified_sources.append(source)
+            except:
+                pass
+            finally:
+                ledger.commit()
+    
+    passed_sources = verified_sources
+    if args.batch:
+        failed = Upserter.flush()
+        passed_sources = []
+        for source in verified_sources:
+            if source['identifier'] in failed:
+                continue
+            try:
+                Upserter.scraper_code(source)
+                passed_sources.append(source)
+            except:
+                pass
+    
+    # if source passes all checks then we perform codegen tasks
+    for source in passed_sources:
+        for domain_obj in source['domains']:
+            codegen_recipes.append({
+                'display_name': source['displayName'],
+                'domain': domain_obj['domain'],
+                'identifier': source['identifier'],
+                'regex': domain_obj['regex']
+            })
 
     print(f"\nVerification done for {len(sources)} sources. {len(codegen_recipes)} passed all checks.\n")
 
     print("\nRunning codegen script to add variables, types, and mappings for sources that passed all checks.\n")
+    CodeGen.session = CodeGenSession()
     code_gen_pipeline.run(codegen_recipes)
+    written = CodeGen.session.flush()
+    UserPrompt.print(f"WROTE {written} files")
     
+    events.close()
+    if args.slowest > 0:
+        timings.show_summary(args.slowest)
+
     print("\n✅ Adding sources completed!")
     print("\n❗  NOTE: You must update the 'include' and 'exclude' lists in the Programmable Search Engine UI.")
+
+    if args.non_interactive and len(passed_sources) < len(sources):
+        exit(1)
     